@@ -1,12 +1,19 @@
 import json
+import re
 import xml.etree.ElementTree as ET
-from time import sleep
+from time import perf_counter
 from urllib import parse, request
 from urllib.error import HTTPError
 
 import tldextract
 
 from .book import Book, BookChapters
+from .cache import CacheMiss, MetadataCache
+from .cassette import cassette
+from .concurrency import concurrency
+from .metrics import metrics
+from .ratelimit import rate_limiter
+from .tracing import tracer
 
 AUDIBLE_ENDPOINTS = {
     "au": "https://api.audible.com.au/1.0/catalog/products",
@@ -31,15 +38,23 @@ USER_AGENT = (
 )
 
 
-def search_audible(keywords: str, region: str) -> dict:
+def search_audible(keywords: str, region: str, cache: MetadataCache | None = None) -> dict:
     params = {
         "response_groups": "contributors,product_attrs,product_desc,product_extended_attrs,series",
         "num_results": 10,
         "products_sort_by": "Relevance",
         "keywords": keywords,
     }
+    if cache is not None and cache.offline:
+        response = cache.get_search(keywords, region)
+        if response is None:
+            raise CacheMiss(f"search for {keywords!r} in the '{region}' region is not cached")
+        return response
+
     query = parse.urlencode(params)
     response = json.loads(make_request(f"{AUDIBLE_ENDPOINTS[region]}?{query}"))
+    if cache is not None:
+        cache.put_search(keywords, region, response)
     return response
 
 
@@ -50,14 +65,54 @@ def search_goodreads(api_key: str, keywords: str) -> ET.Element:
     return ET.fromstring(make_request(url))
 
 
-def get_book_info(asin: str, region: str) -> tuple[Book, BookChapters]:
-    book_response = json.loads(make_request(f"{AUDNEX_ENDPOINT}/books/{asin}?region={region}&update=1"))
-    chapter_response = json.loads(make_request(f"{AUDNEX_ENDPOINT}/books/{asin}/chapters?region={region}&update=1"))
-    book = Book.from_audnex_book(book_response)
-    book_chapters = BookChapters.from_audnex_chapter_info(chapter_response)
+def get_book_info(asin: str, region: str, cache: MetadataCache | None = None) -> tuple[Book, BookChapters]:
+    cached = None
+    if cache is not None:
+        # Books seeded from the library are still better than nothing when offline
+        cached = cache.get_book(asin, region, include_seeded=cache.offline or not cache.revalidate_seeded)
+        metrics.inc("cache_hits_total" if cached is not None else "cache_misses_total", kind="books")
+    if cached is not None:
+        book_response, chapter_response = cached
+    elif cache is not None and cache.offline:
+        raise CacheMiss(f"book {asin} in the '{region}' region is not cached")
+    else:
+        book_response = json.loads(make_request(f"{AUDNEX_ENDPOINT}/books/{asin}?region={region}&update=1"))
+        chapter_response = json.loads(make_request(f"{AUDNEX_ENDPOINT}/books/{asin}/chapters?region={region}&update=1"))
+        if cache is not None:
+            cache.put_book(asin, region, book_response, chapter_response)
+    with metrics.stage("parse_book"):
+        book = Book.from_audnex_book(book_response)
+        book_chapters = BookChapters.from_audnex_chapter_info(chapter_response)
     return book, book_chapters
 
 
+def get_series_book_asins(series_asin: str, region: str) -> list[str]:
+    """Returns the asins of the books in a series, in series order."""
+    params = {"response_groups": "relationships"}
+    query = parse.urlencode(params)
+    response = json.loads(make_request(f"{AUDIBLE_ENDPOINTS[region]}/{series_asin}?{query}"))
+    children = [
+        r
+        for r in response["product"].get("relationships", [])
+        if r.get("relationship_to_product") == "child" and r.get("relationship_type") == "series"
+    ]
+    children.sort(key=lambda r: int(r["sort"]) if str(r.get("sort", "")).isdigit() else 0)
+    return [r["asin"] for r in children]
+
+
+def get_image(url: str, cache: MetadataCache | None = None) -> bytes:
+    image = cache.get_art(url) if cache is not None else None
+    if cache is not None:
+        metrics.inc("cache_hits_total" if image is not None else "cache_misses_total", kind="art")
+    if image is None:
+        if cache is not None and cache.offline:
+            raise CacheMiss(f"image {url} is not cached")
+        image = make_request(url)
+        if cache is not None:
+            cache.put_art(url, image)
+    return image
+
+
 def get_audible_album_url(asin: str, region: str) -> str:
     return f"https://www.audible.{AUDIBLE_REGIONS_SUFFIXES[region]}/pd/{asin}"
 
@@ -74,9 +129,19 @@ def make_request(url: str) -> bytes | None:
     """Makes a request to the specified url and returns received response
     The request will be retried up to 3 times in case of failure.
     """
+    host, endpoint = get_request_labels(url)
     num_retries = 3
     sleep_time = 2
     for n in range(0, num_retries):
+        if n > 0:
+            metrics.inc("request_retries_total", host=host, endpoint=endpoint)
+        if rate_limiter.rate is not None:
+            wait = rate_limiter.reserve(host)
+            if wait > 0:
+                metrics.observe("rate_limit_wait_seconds", wait, host=host)
+                with tracer.span("rate_limit_wait", host=host, seconds=wait):
+                    cassette.sleep(wait)
+        start = perf_counter()
         try:
             req = request.Request(
                 url,
@@ -85,9 +150,16 @@ def make_request(url: str) -> bytes | None:
                     "User-Agent": USER_AGENT,
                 },
             )
-            with request.urlopen(req) as response:
-                return response.read()
+            with (
+                tracer.span(f"GET {host}{endpoint}", url=url, attempt=n + 1),
+                concurrency.slot(host),
+                cassette.open_url(req) as response,
+            ):
+                body = response.read()
+            metrics.record_request(host, endpoint, response.status, perf_counter() - start, len(body))
+            return body
         except HTTPError as e:
+            metrics.record_request(host, endpoint, e.code, perf_counter() - start, 0)
             if e.code == 404:
                 print(f"Error while requesting {url}: status code {e.code}, {e.reason}")
                 raise e
@@ -97,9 +169,28 @@ def make_request(url: str) -> bytes | None:
                     reset_seconds = int(reset_seconds)
                     print(f"got ratelimited, rate limit resets in {reset_seconds}, updating sleep duration")
                     sleep_time = reset_seconds + 1
+                    # Other processes importing at the same time must wait too
+                    rate_limiter.pause(host, reset_seconds)
             print(f"Error while requesting {url}, attempt {n + 1}/{num_retries}: status code {e.code}, {e.reason}")
             if n < num_retries - 1:
-                sleep(sleep_time)
+                with tracer.span("retry_sleep", url=url, seconds=sleep_time):
+                    cassette.sleep(sleep_time)
                 sleep_time *= n
             else:
                 raise e
+        except Exception:
+            metrics.record_request(host, endpoint, "error", perf_counter() - start, 0)
+            raise
+
+
+def get_request_labels(url: str) -> tuple[str, str]:
+    """
+    Returns the host and endpoint of a url for grouping requests in metrics,
+    with asins and image names replaced by placeholders, e.g ("api.audnex.us", "/books/{asin}/chapters").
+    """
+    parts = parse.urlsplit(url)
+    path = parts.path
+    if re.search(r"\.(jpe?g|png|gif)$", path, re.IGNORECASE):
+        return parts.netloc, "/{image}"
+    path = re.sub(r"/[A-Z0-9]{10}(?=/|$)", "/{asin}", path)
+    return parts.netloc, path
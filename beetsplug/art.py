@@ -0,0 +1,15 @@
+from beets.util.artresizer import ArtResizer
+
+
+def resizing_available() -> bool:
+    """Returns whether beets can resize images locally, with either Pillow or ImageMagick."""
+    return ArtResizer.shared.local
+
+
+def normalize_art(path: bytes, maxwidth: int, quality: int) -> bytes:
+    """
+    Shrinks an image to at most `maxwidth` pixels wide and high and re-encodes it at the given quality
+    (0 for the backend's default), returning the path of the new image, or the original one if that failed.
+    Runs in a separate process, so that large images don't hold up the importer.
+    """
+    return ArtResizer.shared.resize(maxwidth, path, quality=quality)
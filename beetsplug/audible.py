@@ -1,13 +1,22 @@
+import copy
 import datetime
+import hashlib
+import json
+import multiprocessing
 import os
 import pathlib
 import re
+import shlex
+import tempfile
+import threading
 import urllib.error
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from contextlib import suppress
 from tempfile import NamedTemporaryFile
 
+import beets
 import mediafile
-import yaml
 from beets import importer, ui, util
 from beets.autotag.distance import distance
 from beets.autotag.hooks import AlbumInfo, TrackInfo
@@ -22,10 +31,31 @@ from .api import (
     get_audible_album_region,
     get_audible_album_url,
     get_book_info,
-    make_request,
+    get_image,
+    get_series_book_asins,
     search_audible,
 )
+from .art import normalize_art, resizing_available
+from .cache import CacheMiss, MetadataCache
+from .cassette import cassette
+from .concurrency import concurrency
 from .goodreads import get_original_date
+from .metadata_file import find_metadata_file, load_metadata_file
+from .metrics import format_summary, metrics, timed
+from .profiling import profiled, profiler
+from .ratelimit import rate_limiter
+from .seeding import responses_from_library_album
+from .sharding import (
+    find_shard_entries,
+    get_worker_command,
+    run_workers,
+    split_into_shards,
+    write_loose_files_config,
+    write_shard_file,
+)
+from .tracing import tracer
+
+ABRIDGED_INDICATOR = r"(?i)\((unabridged|abridged)\)"
 
 
 class Audible(MetadataSourcePlugin):
@@ -37,6 +67,9 @@ class Audible(MetadataSourcePlugin):
         self.config.add(
             {
                 "fetch_art": True,
+                "art_maxwidth": 0,
+                "art_quality": 0,
+                "art_processes": 2,
                 "match_chapters": True,
                 "data_source_mismatch_penalty": 0.0,
                 "write_description_file": True,
@@ -46,6 +79,27 @@ class Audible(MetadataSourcePlugin):
                 "keep_series_reference_in_subtitle": True,
                 "goodreads_apikey": None,
                 "region": "us",
+                "cache": False,
+                "cache_path": None,
+                "local_search": True,
+                "offline": False,
+                "revalidate_seeded": False,
+                "series_prefetch": 0,
+                "region_switch_prefetch": [],
+                "background_sidecar_writes": False,
+                "metrics": False,
+                "metrics_path": None,
+                "metrics_textfile": None,
+                "trace_path": None,
+                "profile_path": None,
+                "profile_aggregate": False,
+                "cassette_mode": "off",
+                "cassette_path": None,
+                "cassette_simulate_latency": False,
+                "adaptive_concurrency": False,
+                "max_concurrency": 8,
+                "rate_limit": 0,
+                "rate_limit_path": None,
             }
         )
         self.config["goodreads_apikey"].redact = True
@@ -53,13 +107,105 @@ class Audible(MetadataSourcePlugin):
         self.config["region"].as_choice(AUDIBLE_REGIONS)
         # Mapping of asin to cover art urls
         self.cover_art_urls = {}
-        # stores paths of downloaded cover art to be used during import
+        # stores paths of downloaded cover art to be used during import,
+        # along with the hash of the image if cover art is resized
         self.cover_art = {}
+        # Resizing of cover art by the hash of the original image, so that each image is only resized once,
+        # with the number of tasks using it, so that the resized image is removed once none of them needs it
+        self.processed_art = {}
+        self.processed_art_lock = threading.Lock()
+        self.art_executor = None
+        self.art_maxwidth = self.config["art_maxwidth"].get(int)
+        if self.art_maxwidth and not resizing_available():
+            self._log.warning("art_maxwidth has no effect since neither Pillow nor ImageMagick is installed")
+            self.art_maxwidth = 0
+        if self.config["art_quality"].get(int) and not self.art_maxwidth:
+            self._log.warning("art_quality has no effect unless cover art is resized with art_maxwidth")
+        # Mapping of asin to the asin of the series it belongs to
+        self.series_asins = {}
+        # (series asin, region) pairs which have already been prefetched
+        self.prefetched_series = set()
+        self.prefetch_lock = threading.Lock()
+        self.prefetch_executor = None
+        self.prefetch_stopped = threading.Event()
+        # Candidates found for each task being imported, keyed by the task's item paths, then by region and query.
+        # Switching between regions for a book only has to look up each region once.
+        self.candidate_memo = {}
+        self.candidate_memo_lock = threading.Lock()
+        # Candidates of other regions are looked up in the background while the user is choosing, if configured
+        self.region_switch_prefetch = self.config["region_switch_prefetch"].as_str_seq()
+        for region in self.region_switch_prefetch:
+            if region not in AUDIBLE_REGIONS:
+                raise ui.UserError(f"Unknown region {region!r} in region_switch_prefetch")
+        self.region_switch_executor = None
+        if self.region_switch_prefetch:
+            self.region_switch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audible-region")
+        # Writes of desc.txt and reader.txt happen in the background if enabled, so they don't block the importer
+        self.sidecar_executor = None
+        self.sidecar_writes = []
+        if self.config["background_sidecar_writes"]:
+            self.sidecar_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="audible-sidecar")
+        # Books in search results are fetched concurrently if enabled, within limits adapting to each host's load
+        self.lookup_executor = None
+        if self.config["adaptive_concurrency"]:
+            max_concurrency = self.config["max_concurrency"].get(int)
+            concurrency.enable(max_concurrency)
+            self.lookup_executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="audible-lookup")
+
+        self.cache = None
+        if self.config["cache"]:
+            if self.config["cache_path"].get():
+                cache_path = self.config["cache_path"].as_filename()
+            else:
+                cache_path = os.path.join(beets.config.config_dir(), "audible.db")
+            self.cache = MetadataCache(
+                cache_path,
+                offline=self.config["offline"].get(bool),
+                revalidate_seeded=self.config["revalidate_seeded"].get(bool),
+            )
+        elif self.config["offline"]:
+            raise ui.UserError("The offline option of the audible plugin requires the cache to be enabled")
 
         self.register_listener("write", self.on_write)
         self.register_listener("import_task_files", self.on_import_task_files)
         self.register_listener("album_matched", self.on_album_matched)
         self.register_listener("before_choose_candidate", self.before_choose_candidate_event)
+        self.register_listener("import_task_choice", self.on_import_task_choice)
+        self.register_listener("cli_exit", self.on_cli_exit)
+        if self.config["metrics"]:
+            self.register_listener("import", self.write_metrics)
+        if self.config["trace_path"].get():
+            tracer.enable()
+            self.register_listener("import", self.write_trace)
+        # The environment variable allows profiling without editing the config
+        profile_path = os.environ.get("BEETS_AUDIBLE_PROFILE")
+        if not profile_path and self.config["profile_path"].get():
+            profile_path = self.config["profile_path"].as_filename()
+        if profile_path:
+            profiler.enable(profile_path, aggregate=self.config["profile_aggregate"].get(bool))
+
+        # YAML reads an unquoted `off` as false
+        if self.config["cassette_mode"].get() in (False, None):
+            cassette_mode = "off"
+        else:
+            cassette_mode = self.config["cassette_mode"].as_choice(["off", "record", "replay"])
+        if cassette_mode != "off":
+            if self.config["cassette_path"].get():
+                cassette_path = self.config["cassette_path"].as_filename()
+            else:
+                cassette_path = os.path.join(beets.config.config_dir(), "audible_cassettes")
+            cassette.enable(cassette_path, cassette_mode, self.config["cassette_simulate_latency"].get(bool))
+
+        rate_limit = self.config["rate_limit"].as_number()
+        if rate_limit:
+            if self.config["rate_limit_path"].get():
+                rate_limit_path = self.config["rate_limit_path"].as_filename()
+            else:
+                rate_limit_path = os.path.join(beets.config.config_dir(), "audible_ratelimit.db")
+            rate_limiter.enable(rate_limit_path, rate_limit)
+
+        if self.config["series_prefetch"].get(int) and (self.cache is None or self.cache.offline):
+            self._log.warning("series_prefetch has no effect unless the cache is enabled and not offline")
 
         if self.config["fetch_art"]:
             self.import_stages = [self.fetch_art]
@@ -124,20 +270,26 @@ class Audible(MetadataSourcePlugin):
         region = mediafile.MediaField()
         self.add_media_field("region", region)
 
+    @profiled(
+        "candidates",
+        lambda self, items, *args, **kwargs: util.displayable_path(os.path.basename(os.path.dirname(items[0].path))),
+    )
+    @timed("candidates")
     def candidates(self, items, artist, album, va_likely) -> list[AlbumInfo]:
         """Returns a list of AlbumInfo objects for Audible search results
         matching an album and artist (if not various).
         """
         folder_path = pathlib.Path(items[0].path.decode()).parent
-        yml_metadata_file_path = folder_path / "metadata.yml"
-        if yml_metadata_file_path.is_file():
-            self._log.debug("Reading data from metadata.yml")
+        tracer.annotate(folder=folder_path)
+        metadata_file_path = find_metadata_file(str(folder_path))
+        if metadata_file_path is not None:
+            metadata_file_name = os.path.basename(metadata_file_path)
+            self._log.debug(f"Reading data from {metadata_file_name}")
             try:
-                with open(str(yml_metadata_file_path)) as f:
-                    data = yaml.load(f, Loader=yaml.SafeLoader)
-                    return [self.get_album_from_yaml_metadata(data, items)]
+                data = load_metadata_file(metadata_file_path)
+                return [self.get_album_from_yaml_metadata(data, items)]
             except Exception:
-                self._log.error("Error while reading data from metadata.yml", exc_info=True)
+                self._log.error(f"Error while reading data from {metadata_file_name}", exc_info=True)
                 return []
 
         if not album and not artist:
@@ -153,27 +305,19 @@ class Audible(MetadataSourcePlugin):
         # can also negate an otherwise positive result.
         query = re.sub(r"(?i)\b(CD|disc)\s*\d+", "", query)
         # Strip "(unabridged)" or "(abridged)"
-        abridged_indicator = r"(?i)\((unabridged|abridged)\)"
-        query = re.sub(abridged_indicator, "", query)
+        query = re.sub(ABRIDGED_INDICATOR, "", query)
 
         # The book level region has a higher priority than the config level.
         region = get_item_region(items[0])
         if region is None:
             region = self.config["region"].get()
 
-        self._log.debug(f"Searching Audible for {query} in the '{region}' region")
-        albums = self.get_albums(query, region)
+        tracer.annotate(query=query, region=region)
+        albums = self.get_memoized_albums(get_task_key(items), query, album, None if va_likely else artist, region)
         for a in albums:
             is_chapter_data_accurate = a.is_chapter_data_accurate
-            punctuation = r"[^\w\s\d]"
-            # normalize by removing punctuation, converting to lowercase,
-            # as well as changing multiple consecutive spaces in the string to a single space
-            normalized_book_title = re.sub(punctuation, "", a.album.strip().lower())
-            normalized_book_title = " ".join(normalized_book_title.split())
-            normalized_album_name = re.sub(abridged_indicator, "", album.strip().lower())
-            normalized_album_name = re.sub(punctuation, "", normalized_album_name)
-
-            normalized_album_name = " ".join(normalized_album_name.split())
+            normalized_book_title = normalize_title(a.album)
+            normalized_album_name = normalize_title(album)
             self._log.debug(f"Matching album name {normalized_album_name} with book title {normalized_book_title}")
             # account for different length strings
             is_likely_match = (
@@ -196,6 +340,7 @@ class Audible(MetadataSourcePlugin):
                 )
         return albums
 
+    @timed("align_tracks")
     def maybe_align_tracks_with_items(self, album_info, items, *, is_likely_match=True) -> int | None:
         """Override chapter data from Audible with the current file list when needed."""
         if not is_likely_match or not items or not album_info.tracks:
@@ -226,7 +371,10 @@ class Audible(MetadataSourcePlugin):
         return chapter_count_from_audible
 
     def get_album_from_yaml_metadata(self, data, items) -> AlbumInfo:
-        """Returns an `AlbumInfo` object by populating it with details from metadata.yml"""
+        """
+        Returns an `AlbumInfo` object by populating it with details from metadata.yml or metadata.json,
+        which has already been validated by `load_metadata_file`
+        """
         title = data["title"]
         subtitle = data.get("subtitle")
         release_date = data["releaseDate"]
@@ -306,12 +454,15 @@ class Audible(MetadataSourcePlugin):
             **common_attributes,
         )
 
+    @profiled("album_for_id", lambda self, album_id: album_id)
+    @timed("album_for_id")
     def album_for_id(self, album_id) -> AlbumInfo | None:
         """
         Fetches book info by its asin and returns an AlbumInfo object
         or None if the book was not found.
         """
         asin = album_id
+        tracer.annotate(asin=asin)
         self._log.debug(f"Searching for book {asin}")
         try:
             return self.get_album_info(asin, self.config["region"].get())
@@ -320,40 +471,131 @@ class Audible(MetadataSourcePlugin):
             self._log.debug(f"Exception while getting book {asin}", exc_info=True)
             return None
 
+    def get_memoized_albums(self, task_key, query, album, artist, region, speculative=False) -> list[AlbumInfo]:
+        """
+        Returns copies of the books found for a task in a region, looking them up only if they haven't been yet.
+        If they are still being looked up in the background, waits for that to finish.
+        Speculative lookups are skipped if the task is already done.
+        """
+        with self.candidate_memo_lock:
+            if speculative and task_key not in self.candidate_memo:
+                return []
+            memo = self.candidate_memo.setdefault(task_key, {"lookup": None, "albums": {}})
+            memo["lookup"] = (query, album, artist)
+            future = memo["albums"].get((region, query))
+            is_owner = future is None
+            if is_owner:
+                future = memo["albums"][(region, query)] = Future()
+
+        if not is_owner:
+            self._log.debug(f"Reusing books found for {query} in the '{region}' region")
+            return copy.deepcopy(future.result())
+        try:
+            albums = self.find_albums(query, album, artist, region)
+        except BaseException as e:
+            future.set_exception(e)
+            with self.candidate_memo_lock:
+                memo["albums"].pop((region, query), None)
+            raise
+        future.set_result(albums)
+        if not albums:
+            # Nothing found may be due to a network error, so look again next time
+            with self.candidate_memo_lock:
+                memo["albums"].pop((region, query), None)
+        # Candidates are modified by aligning their tracks and by beets, so the memo keeps its own copy
+        return copy.deepcopy(albums)
+
+    def find_albums(self, query, album, artist, region) -> list[AlbumInfo]:
+        """Returns books matching the query in the local index if possible, or otherwise by searching Audible."""
+        albums = []
+        if self.cache is not None and self.config["local_search"] and album:
+            albums = self.get_albums_from_cache(album, artist, region)
+        if not albums:
+            self._log.debug(f"Searching Audible for {query} in the '{region}' region")
+            albums = self.get_albums(query, region)
+        return albums
+
+    def get_albums_from_cache(self, album, artist, region) -> list[AlbumInfo]:
+        """
+        Returns AlbumInfo objects for books in the local index whose title matches the album
+        and whose authors match the artist (if given), without searching Audible.
+        """
+        normalized_album_name = normalize_title(album)
+        normalized_artist = re.sub(r"[^\w]", "", artist).lower() if artist else None
+        try:
+            hits = self.cache.search(normalized_album_name, region)
+        except Exception:
+            self._log.debug("Error while searching the local index", exc_info=True)
+            return []
+
+        out = []
+        for hit in self.exclude_unreleased(hits):
+            if normalize_title(hit["title"]) != normalized_album_name:
+                continue
+            if normalized_artist is not None:
+                authors = [re.sub(r"[^\w]", "", a).lower() for a in hit["authors"].split(", ")]
+                if not any(a and a in normalized_artist for a in authors):
+                    continue
+            try:
+                out.append(self.get_album_info(hit["asin"], region))
+            except Exception:
+                self._log.debug(f"Error while fetching book {hit['asin']} from the local index", exc_info=True)
+        if out:
+            self._log.debug(f"Found {len(out)} books for {album} in the local index")
+        return out
+
+    @timed("get_albums")
     def get_albums(self, query, region) -> list[AlbumInfo]:
         """Returns a list of AlbumInfo objects for an Audible search query."""
 
+        tracer.annotate(query=query, region=region)
         try:
-            results = search_audible(query, region)
+            results = search_audible(query, region, self.cache)
+        except CacheMiss:
+            self._log.debug("Search for {0!r} is not in the cache", query)
+            return []
         except Exception:
             self._log.warning("Could not connect to Audible API while searching for {0!r}", query, exc_info=True)
             return []
 
         try:
-            products = results["products"]
-            today = datetime.datetime.now().strftime("%Y-%m-%d")
-            products_without_unreleased_entries = [p for p in products if p["release_date"] <= today]
-            if len(products_without_unreleased_entries) < len(products):
-                # see https://github.com/laxamentumtech/audnexus/issues/239
-                self._log.info(
-                    f"Excluded {len(products) - len(products_without_unreleased_entries)} books which have"
-                    f" not been released from consideration."
-                )
-            out = []
-            for p in products_without_unreleased_entries:
-                try:
-                    out.append(self.get_album_info(p["asin"], region))
-                except urllib.error.HTTPError:
-                    self._log.debug("Error while fetching book information from Audnex", exc_info=True)
-            return out
+            asins = [p["asin"] for p in self.exclude_unreleased(results["products"])]
+            if self.lookup_executor is not None:
+                albums = self.lookup_executor.map(lambda asin: self.try_get_album_info(asin, region), asins)
+            else:
+                albums = (self.try_get_album_info(asin, region) for asin in asins)
+            return [a for a in albums if a is not None]
         except Exception:
             self._log.warning("Error while fetching book information from Audnex", exc_info=True)
             return []
 
+    def exclude_unreleased(self, products) -> list[dict]:
+        """Returns the products, from search results or the local index, which have been released."""
+        today = datetime.datetime.now().strftime("%Y-%m-%d")
+        released = [p for p in products if (p["release_date"] or "") <= today]
+        if len(released) < len(products):
+            # see https://github.com/laxamentumtech/audnexus/issues/239
+            self._log.info(
+                f"Excluded {len(products) - len(released)} books which have not been released from consideration."
+            )
+        return released
+
+    def try_get_album_info(self, asin, region) -> AlbumInfo | None:
+        """Returns an AlbumInfo object for a book in search results, or None if the book couldn't be fetched."""
+        try:
+            return self.get_album_info(asin, region)
+        except urllib.error.HTTPError:
+            self._log.debug("Error while fetching book information from Audnex", exc_info=True)
+        except CacheMiss:
+            self._log.debug(f"Book {asin} is not in the cache")
+        return None
+
+    @timed("get_album_info")
     def get_album_info(self, asin, region) -> AlbumInfo:
         """Returns an AlbumInfo object for a book given its asin."""
 
-        (book, chapters) = get_book_info(asin, region)
+        tracer.annotate(asin=asin, region=region)
+        (book, chapters) = get_book_info(asin, region, self.cache)
 
         title = book.title
         subtitle = book.subtitle
@@ -450,13 +692,17 @@ class Audible(MetadataSourcePlugin):
         day = int(release_date[8:10])
 
         self.cover_art_urls[asin] = cover_url
+        if series:
+            self.series_asins[asin] = series.asin
 
         original_year = year
         original_month = month
         original_day = day
 
-        if self.config["goodreads_apikey"]:
-            original_date = get_original_date(self, asin, authors, title)
+        # Goodreads responses aren't cached, so they can't be used offline
+        if self.config["goodreads_apikey"] and not (self.cache and self.cache.offline):
+            with metrics.stage("goodreads"):
+                original_date = get_original_date(self, asin, authors, title)
             if original_date.get("year") is not None:
                 original_year = original_date.get("year")
                 original_month = original_date.get("month")
@@ -514,6 +760,8 @@ class Audible(MetadataSourcePlugin):
                 # The "mvi" tag for m4b files only accepts integers
                 tags["mvi"] = int(tags.get("series_position"))
 
+    @profiled("fetch_art", lambda self, session, task: task.album.asin or util.displayable_path(task.paths[0]))
+    @timed("fetch_art")
     def fetch_art(self, session, task) -> None:
         # Only fetch art for albums
         if task.is_album:
@@ -524,6 +772,7 @@ class Audible(MetadataSourcePlugin):
             if task.choice_flag not in (importer.Action.APPLY, importer.Action.RETAG):
                 return
 
+            tracer.annotate(asin=task.album.asin)
             cover_url = self.cover_art_urls.get(task.album.asin)
             author = task.album.albumartist
             title = task.album.album
@@ -533,7 +782,7 @@ class Audible(MetadataSourcePlugin):
 
             try:
                 cover_path = self.fetch_image(cover_url)
-                self.cover_art[task] = cover_path
+                self.cover_art[task] = (cover_path, self.process_art(cover_path) if self.art_maxwidth else None)
             except Exception:
                 self._log.warning(
                     f"Error while downloading cover art for {title} by {author} from {cover_url}", exc_info=True
@@ -541,43 +790,114 @@ class Audible(MetadataSourcePlugin):
 
     def fetch_image(self, url) -> bytes:
         """Downloads an image from a URL and returns a path to the downloaded image."""
-        image = make_request(url)
+        image = get_image(url, self.cache)
         ext = url[-4:]  # e.g, ".jpg"
         with NamedTemporaryFile(suffix=ext, delete=False) as fh:
             fh.write(image)
         self._log.debug("downloaded art to: {0}", util.displayable_path(fh.name))
         return util.bytestring_path(fh.name)
 
+    def process_art(self, path) -> str:
+        """
+        Starts resizing and re-encoding downloaded cover art in a separate process, unless it already is being.
+        Returns the hash of the image, which identifies the resized image until `release_art` is called.
+        """
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        with self.processed_art_lock:
+            if digest in self.processed_art:
+                self.processed_art[digest]["tasks"] += 1
+                return digest
+            if self.art_executor is None:
+                # Forking a process running the importer's threads isn't safe
+                self.art_executor = ProcessPoolExecutor(
+                    max_workers=self.config["art_processes"].get(int),
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            quality = self.config["art_quality"].get(int)
+            future = self.art_executor.submit(normalize_art, path, self.art_maxwidth, quality)
+            self.processed_art[digest] = {"future": future, "source": path, "tasks": 1}
+        return digest
+
+    def get_processed_art(self, cover_path, digest) -> bytes:
+        """Waits for the resized version of a task's cover art, returning the original if resizing failed."""
+        with self.processed_art_lock:
+            processed = self.processed_art[digest]
+        try:
+            with metrics.stage("process_art_wait"):
+                path = processed["future"].result()
+        except Exception:
+            self._log.warning("Error while resizing cover art, using the original image", exc_info=True)
+            return cover_path
+        # The resized image is the original when resizing fails, which may be another task's download of the image
+        return cover_path if path == processed["source"] else path
+
+    def release_art(self, cover_path, digest) -> None:
+        """Removes a task's downloaded cover art, and its resized version once no other task needs it."""
+        paths = [cover_path]
+        if digest is not None:
+            with self.processed_art_lock:
+                processed = self.processed_art[digest]
+                processed["tasks"] -= 1
+                if processed["tasks"] == 0:
+                    del self.processed_art[digest]
+                    future = processed["future"]
+                    resized = future.done() and not future.cancelled() and future.exception() is None
+                    if resized and future.result() != processed["source"]:
+                        paths.append(future.result())
+        for path in paths:
+            with suppress(OSError):
+                os.remove(path)
+
     def on_import_task_files(self, task, session) -> None:
         self.write_book_description_and_narrator(task.imported_items())
         if self.config["fetch_art"] and task in self.cover_art:
-            cover_path = self.cover_art.pop(task)
-            task.album.set_art(cover_path, True)
-            task.album.store()
+            cover_path, digest = self.cover_art.pop(task)
+            try:
+                art_path = cover_path if digest is None else self.get_processed_art(cover_path, digest)
+                task.album.set_art(art_path, True)
+                task.album.store()
+            finally:
+                # The album has its own copy of the art
+                self.release_art(cover_path, digest)
 
     def write_book_description_and_narrator(self, items) -> None:
-        """Write description.txt, reader.txt and cover art"""
+        """Write desc.txt and reader.txt, skipping files whose content is unchanged"""
         if len(items) == 0:
             return
 
         item = items[0]
         destination = os.path.dirname(item.path)
 
+        files = []
         if self.config["write_description_file"]:
-            description = item.comments
-            with open(os.path.join(destination, b"desc.txt"), "w") as f:
-                f.write(description)
-
+            files.append((os.path.join(destination, b"desc.txt"), item.comments))
         if self.config["write_reader_file"]:
-            narrator = ", ".join(item.composers or [])
-            with open(os.path.join(destination, b"reader.txt"), "w") as f:
-                f.write(narrator)
+            files.append((os.path.join(destination, b"reader.txt"), ", ".join(item.composers or [])))
+
+        for path, content in files:
+            if self.sidecar_executor is not None:
+                self.sidecar_writes.append(self.sidecar_executor.submit(self.write_sidecar_file, path, content))
+            else:
+                self.write_sidecar_file(path, content)
 
+    @timed("write_sidecar_file")
+    def write_sidecar_file(self, path, content) -> None:
+        tracer.annotate(path=util.displayable_path(path))
+        if write_file_if_changed(path, content):
+            self._log.debug("wrote {0}", util.displayable_path(path))
+        else:
+            self._log.debug("{0} is unchanged, not rewriting it", util.displayable_path(path))
+
+    @profiled("on_album_matched", lambda self, match: match.info.album_id)
+    @timed("on_album_matched")
     def on_album_matched(self, match) -> None:
         """Adjust final album matches to align tracks with imported files where needed."""
         if match.info.data_source != self.data_source:
             return
 
+        tracer.annotate(asin=match.info.album_id)
+
         # AlbumMatch carries matched and unmatched items separately; use both so
         # manual ASIN matches can align against the full import task.
         all_items = match.items + match.extra_items
@@ -591,9 +911,280 @@ class Audible(MetadataSourcePlugin):
         match.extra_tracks = extra_tracks
         match.distance = distance(all_items, match.info, item_info_pairs)
 
+    def maybe_prefetch_series(self, album_info) -> None:
+        """
+        Starts fetching the other books in the chosen book's series into the cache in the background,
+        since they are likely to be imported next.
+        """
+        budget = self.config["series_prefetch"].get(int)
+        series_asin = self.series_asins.get(album_info.album_id)
+        if self.cache is None or self.cache.offline or budget <= 0 or series_asin is None:
+            return
+
+        key = (series_asin, album_info.region)
+        with self.prefetch_lock:
+            if key in self.prefetched_series:
+                return
+            self.prefetched_series.add(key)
+            if self.prefetch_executor is None:
+                self.prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audible-prefetch")
+        self.prefetch_executor.submit(self.prefetch_series, series_asin, album_info.album_id, album_info.region, budget)
+
+    @timed("prefetch_series")
+    def prefetch_series(self, series_asin, asin, region, budget) -> None:
+        """Fetches up to `budget` books of a series and their cover art into the cache."""
+        tracer.annotate(series_asin=series_asin, region=region)
+        try:
+            asins = get_series_book_asins(series_asin, region)
+        except Exception:
+            self._log.debug(f"Error while fetching books in series {series_asin}", exc_info=True)
+            return
+
+        # Start with the books after the matched one, since series are usually imported in order
+        if asin in asins:
+            i = asins.index(asin)
+            asins = asins[i + 1 :] + asins[:i]
+        asins = [a for a in asins if not self.cache.has_book(a, region)][:budget]
+        self._log.debug(f"Prefetching {len(asins)} books in series {series_asin}")
+        for a in asins:
+            if self.prefetch_stopped.is_set():
+                return
+            try:
+                book, _ = get_book_info(a, region, self.cache)
+                get_image(book.image_url, self.cache)
+            except Exception:
+                self._log.debug(f"Error while prefetching book {a}", exc_info=True)
+
+    def on_cli_exit(self, lib) -> None:
+        profiler.write_aggregate()
+        if self.sidecar_executor is not None:
+            # Unlike prefetching, pending writes must not be lost
+            self.sidecar_executor.shutdown()
+            for f in self.sidecar_writes:
+                if f.exception() is not None:
+                    self._log.warning("Error while writing desc.txt or reader.txt", exc_info=f.exception())
+        if self.lookup_executor is not None:
+            self.lookup_executor.shutdown()
+        if self.region_switch_executor is not None:
+            self.region_switch_executor.shutdown(cancel_futures=True)
+        if self.art_executor is not None:
+            self.art_executor.shutdown(cancel_futures=True)
+        # Art of tasks which didn't finish importing
+        for cover_path, digest in self.cover_art.values():
+            self.release_art(cover_path, digest)
+        self.cover_art.clear()
+        if self.prefetch_executor is not None:
+            self.prefetch_stopped.set()
+            self.prefetch_executor.shutdown(cancel_futures=True)
+        if self.cache is not None:
+            self.cache.close()
+        rate_limiter.close()
+
+    def get_metrics_path(self) -> str:
+        if self.config["metrics_path"].get():
+            return self.config["metrics_path"].as_filename()
+        return os.path.join(beets.config.config_dir(), "audible_metrics.json")
+
+    def write_metrics(self, lib, paths) -> None:
+        """Writes the metrics collected during an import to the configured files."""
+        try:
+            metrics.write(self.get_metrics_path())
+            if self.config["metrics_textfile"].get():
+                metrics.write(self.config["metrics_textfile"].as_filename(), fmt="prometheus")
+        except OSError:
+            self._log.warning("Error while writing metrics", exc_info=True)
+
+    def write_trace(self, lib, paths) -> None:
+        """Writes the spans recorded during an import as a Chrome trace-event file."""
+        try:
+            tracer.write(self.config["trace_path"].as_filename())
+        except OSError:
+            self._log.warning("Error while writing trace", exc_info=True)
+
+    def commands(self) -> list[ui.Subcommand]:
+        stats_command = ui.Subcommand("audible-stats", help="show request and timing metrics of the last import")
+
+        def show_stats(lib, opts, args):
+            path = self.get_metrics_path()
+            try:
+                with open(path, encoding="utf-8") as f:
+                    summary = json.load(f)
+            except FileNotFoundError:
+                raise ui.UserError(
+                    f"No metrics found at {path}, enable the metrics option and import some books"
+                ) from None
+            ui.print_(format_summary(summary))
+
+        stats_command.func = show_stats
+
+        export_command = ui.Subcommand(
+            "audible-export-cache", help="export the metadata cache to a bundle file for use on other machines"
+        )
+        export_command.parser.usage += " BUNDLE"
+
+        def export_cache(lib, opts, args):
+            path = self.get_bundle_path(args)
+            try:
+                counts = self.cache.export_bundle(path)
+            except OSError as e:
+                raise ui.UserError(f"Could not export to {util.displayable_path(path)}: {e}") from None
+            ui.print_(
+                f"Exported {counts['books']} books, {counts['searches']} searches"
+                f" and {counts['art']} images to {util.displayable_path(path)}"
+            )
+
+        export_command.func = export_cache
+
+        import_command = ui.Subcommand("audible-import-cache", help="load a bundle file into the metadata cache")
+        import_command.parser.usage += " BUNDLE"
+
+        def import_cache(lib, opts, args):
+            path = self.get_bundle_path(args)
+            try:
+                counts = self.cache.import_bundle(path)
+            except (OSError, ValueError) as e:
+                raise ui.UserError(f"Could not import {util.displayable_path(path)}: {e}") from None
+            ui.print_(f"Imported {counts['books']} books, {counts['searches']} searches and {counts['art']} images")
+
+        import_command.func = import_cache
+
+        seed_command = ui.Subcommand(
+            "audible-seed-cache", help="add books imported with this plugin to the metadata cache, from the library"
+        )
+        seed_command.parser.add_option(
+            "-o", "--overwrite", action="store_true", help="replace books which are already cached"
+        )
+
+        def seed_cache(lib, opts, args):
+            if self.cache is None:
+                raise ui.UserError("The cache option of the audible plugin must be enabled")
+            count = self.seed_cache(lib.albums(args), opts.overwrite)
+            ui.print_(f"Added {count} books to the cache")
+
+        seed_command.func = seed_cache
+
+        sharded_import_command = ui.Subcommand(
+            "audible-import", help="import folders of books with several beets processes at the same time"
+        )
+        sharded_import_command.parser.usage += " PATH..."
+        sharded_import_command.parser.add_option(
+            "-w", "--workers", type="int", default=os.cpu_count(), help="number of import processes to run"
+        )
+        sharded_import_command.parser.add_option(
+            "-a", "--import-args", default="", help='options for each "beet import" process, e.g "--move -l import.log"'
+        )
+        sharded_import_command.parser.add_option(
+            "-s",
+            "--split-files",
+            action="store_true",
+            default=False,
+            help="import each file next to the subfolders of a path as a book of its own",
+        )
+
+        def sharded_import(lib, opts, args):
+            if not args:
+                raise ui.UserError("no path specified")
+            if opts.workers < 1:
+                raise ui.UserError("the number of workers must be at least 1")
+            if self.cache is None:
+                self._log.warning("the cache is disabled, so each worker looks up every book on its own")
+            if not self.config["rate_limit"].as_number():
+                self._log.warning("rate_limit is not set, so the workers' requests are not limited together")
+            try:
+                entries, loose_file_folders = find_shard_entries(
+                    [os.path.abspath(os.path.expanduser(a)) for a in args], opts.split_files
+                )
+            except OSError as e:
+                raise ui.UserError(f"Could not list folders to import: {e}") from None
+            # The files at the top of a folder are imported by a worker of their own, which ignores its subfolders
+            shards = split_into_shards(entries, max(1, opts.workers - len(loose_file_folders)))
+            worker_count = len(shards) + len(loose_file_folders)
+            ui.print_(
+                f"Importing {len(entries) + len(loose_file_folders)} folders and files with {worker_count} workers"
+            )
+            import_args = shlex.split(opts.import_args)
+            with tempfile.TemporaryDirectory(prefix="beets-audible-shards-") as shard_dir:
+                commands = []
+                for i, shard in enumerate(shards):
+                    shard_path = os.path.join(shard_dir, f"shard-{i}.log")
+                    paths = write_shard_file(shard_path, shard)
+                    commands.append(get_worker_command(shard_path, import_args, paths))
+                for i, folder in enumerate(loose_file_folders):
+                    config_path = os.path.join(shard_dir, f"loose-files-{i}.yaml")
+                    try:
+                        write_loose_files_config(config_path, folder)
+                    except OSError as e:
+                        raise ui.UserError(f"Could not list folders to import: {e}") from None
+                    commands.append(get_worker_command(None, import_args, [folder], config_path))
+                exit_codes = run_workers(commands)
+            failed = [i for i, code in enumerate(exit_codes) if code != 0]
+            if failed:
+                raise ui.UserError(f"{len(failed)} of {len(commands)} workers failed")
+
+        sharded_import_command.func = sharded_import
+        return [stats_command, export_command, import_command, seed_command, sharded_import_command]
+
+    def seed_cache(self, albums, overwrite=False) -> int:
+        """Adds books from the library to the cache, so that re-matching them doesn't need the network."""
+        default_region = self.config["region"].get()
+        books = []
+        for album in albums:
+            if album.get("data_source") != self.data_source:
+                continue
+            try:
+                # Books imported before the region field existed only have it in their album_url
+                book = responses_from_library_album(album, lambda item: get_item_region(item) or default_region)
+            except Exception:
+                self._log.warning(f"Error while reading {album} from the library", exc_info=True)
+                continue
+            if book is None:
+                self._log.debug(f"Not enough data in the library to add {album} to the cache")
+                continue
+            books.append(book)
+        return self.cache.seed_books(books, overwrite=overwrite)
+
+    def get_bundle_path(self, args) -> str:
+        if self.cache is None:
+            raise ui.UserError("The cache option of the audible plugin must be enabled")
+        if len(args) != 1:
+            raise ui.UserError("Expected the path of a bundle file")
+        return os.path.abspath(os.path.expanduser(args[0]))
+
     def before_choose_candidate_event(self, session, task) -> list[PromptChoice]:
+        self.prefetch_other_regions(task)
         return [PromptChoice("r", "Region switch", self.book_level_region_switch)]
 
+    def prefetch_other_regions(self, task) -> None:
+        """Starts looking up the task's book in the regions of `region_switch_prefetch`, while the user chooses."""
+        if self.region_switch_executor is None or not task.is_album:
+            return
+        task_key = get_task_key(task.items)
+        with self.candidate_memo_lock:
+            memo = self.candidate_memo.get(task_key)
+            lookup = memo["lookup"] if memo is not None else None
+        if lookup is None:
+            return
+        current_region = get_item_region(task.items[0]) or self.config["region"].get()
+        for region in self.region_switch_prefetch:
+            if region != current_region:
+                self.region_switch_executor.submit(self.prefetch_region, task_key, *lookup, region)
+
+    def prefetch_region(self, task_key, query, album, artist, region) -> None:
+        try:
+            self.get_memoized_albums(task_key, query, album, artist, region, speculative=True)
+        except Exception:
+            self._log.debug(f"Error while looking up {query} in the '{region}' region", exc_info=True)
+
+    def on_import_task_choice(self, session, task) -> None:
+        # Once a candidate is chosen, the task's candidates won't be needed again
+        if task.is_album:
+            with self.candidate_memo_lock:
+                self.candidate_memo.pop(get_task_key(task.items), None)
+        # album_matched is sent for every candidate, so series are only prefetched for the chosen one
+        match = task.match
+        if task.is_album and match is not None and match.info.data_source == self.data_source:
+            self.maybe_prefetch_series(match.info)
+
     def book_level_region_switch(self, session, task) -> None:
         """Prompts the book level region value"""
         available_region_codes = ", ".join(colorize("text_diff_added", reg) for reg in AUDIBLE_REGIONS)
@@ -633,6 +1224,45 @@ class Audible(MetadataSourcePlugin):
         task.lookup_candidates()
 
 
+def write_file_if_changed(path: bytes, content: str) -> bool:
+    """
+    Atomically writes text to a file through a temporary file in the same folder, unless the file already
+    has the same content. Returns whether the file was written.
+    """
+    data = content.encode("utf-8")
+    with suppress(OSError), open(path, "rb") as f:
+        if f.read() == data:
+            return False
+
+    temp_path = path + f".{uuid.uuid4().hex}.tmp".encode()
+    # Unlike mkstemp, this creates the file with the same permissions as open() would
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        with suppress(OSError):
+            os.remove(temp_path)
+        raise
+    return True
+
+
+def get_task_key(items) -> tuple[bytes, ...]:
+    """Returns a key identifying the import task of the given items."""
+    return tuple(item.path for item in items)
+
+
+def normalize_title(title: str) -> str:
+    """
+    Normalizes a title for comparison by removing "(abridged)" indicators and punctuation, converting to lowercase,
+    as well as changing multiple consecutive spaces in the string to a single space
+    """
+    normalized = re.sub(ABRIDGED_INDICATOR, "", title.strip().lower())
+    normalized = re.sub(r"[^\w\s\d]", "", normalized)
+    return " ".join(normalized.split())
+
+
 def get_item_region(item) -> str | None:
     """Get the value of the 'region' field, if it is available, or can be extracted from 'album_url'."""
     available_field_names = item.keys()
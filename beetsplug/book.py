@@ -133,9 +133,13 @@ class Book:
         else:
             series = None
         summary_html = b["summary"]
-        summary_markdown = md(summary_html)
-        # Remove blank lines from the start and end, as well as whitespace from each line
-        normalized_summary_markdown = "\n".join([line.strip() for line in summary_markdown.strip().splitlines()])
+        if "summaryMarkdown" in b:
+            # Books rebuilt from the library only have the summary already converted to markdown
+            normalized_summary_markdown = b["summaryMarkdown"]
+        else:
+            summary_markdown = md(summary_html)
+            # Remove blank lines from the start and end, as well as whitespace from each line
+            normalized_summary_markdown = "\n".join([line.strip() for line in summary_markdown.strip().splitlines()])
         return Book(
             asin=b["asin"],
             authors=[Author(asin=a.get("asin"), name=a["name"]) for a in b["authors"]],
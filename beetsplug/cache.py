@@ -0,0 +1,345 @@
+import base64
+import gzip
+import json
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+BUNDLE_FORMAT = "beets-audible-cache"
+BUNDLE_VERSION = 1
+# Seconds to wait for other processes sharing the cache to finish writing
+BUSY_TIMEOUT = 60
+# Sources of cached books: fetched from Audnex, or rebuilt from the beets library by `audible-seed-cache`
+SOURCE_AUDNEX = "audnex"
+SOURCE_LIBRARY = "library"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    asin TEXT NOT NULL,
+    region TEXT NOT NULL,
+    book TEXT NOT NULL,
+    chapters TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    source TEXT NOT NULL DEFAULT 'audnex',
+    PRIMARY KEY (asin, region)
+);
+CREATE TABLE IF NOT EXISTS searches (
+    keywords TEXT NOT NULL,
+    region TEXT NOT NULL,
+    response TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (keywords, region)
+);
+CREATE TABLE IF NOT EXISTS art (
+    url TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS indexed_products (
+    id INTEGER PRIMARY KEY,
+    asin TEXT NOT NULL,
+    region TEXT NOT NULL,
+    release_date TEXT,
+    UNIQUE (asin, region)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+    asin UNINDEXED,
+    region UNINDEXED,
+    title,
+    subtitle,
+    authors,
+    narrators,
+    series,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+class CacheMiss(Exception):
+    """Raised when data that isn't cached is needed while offline."""
+
+
+class MetadataCache:
+    """
+    Persistent store of Audnex responses, Audible searches and cover art, along with a full-text index
+    of every product seen, so that repeated lookups can be answered without going to the network.
+    When `offline` is set, data missing from the cache raises `CacheMiss` instead of being fetched.
+    When `revalidate_seeded` is set, books seeded from the library are fetched again the next time they're needed.
+    The cache can be shared by several processes importing at the same time.
+    """
+
+    def __init__(self, path: str, offline: bool = False, revalidate_seeded: bool = False):
+        self.path = path
+        self.offline = offline
+        self.revalidate_seeded = revalidate_seeded
+        # The importer calls into the plugin from several threads
+        self._lock = threading.Lock()
+        # Transactions are managed by `_transaction` rather than by the sqlite3 module
+        self._conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False, isolation_level=None)
+        # In WAL mode, readers in other processes aren't blocked while one process writes
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get_book(self, asin: str, region: str, include_seeded: bool = True) -> tuple[dict, dict] | None:
+        """
+        Returns the cached Audnex book and chapter responses for a book, if present.
+        With `include_seeded` unset, books seeded from the library are treated as missing.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT book, chapters, source FROM books WHERE asin = ? AND region = ?", (asin, region)
+            ).fetchone()
+        if row is None or (not include_seeded and row[2] == SOURCE_LIBRARY):
+            return None
+        return json.loads(row[0]), json.loads(row[1])
+
+    def put_book(
+        self, asin: str, region: str, book_response: dict, chapter_response: dict, fetched_at: float | None = None
+    ) -> None:
+        """Stores Audnex book and chapter responses, and indexes the book for local search."""
+        with self._transaction():
+            self._insert_book(asin, region, book_response, chapter_response, fetched_at or time.time())
+
+    def seed_books(self, books, overwrite: bool = False) -> int:
+        """
+        Stores books rebuilt from the library, given as (asin, region, book response, chapter response) tuples,
+        in a single transaction. Unless `overwrite` is set, books which are already cached are left alone.
+        Returns the number of books stored.
+        """
+        count = 0
+        now = time.time()
+        with self._transaction():
+            for asin, region, book_response, chapter_response in books:
+                if (
+                    not overwrite
+                    and self._conn.execute(
+                        "SELECT 1 FROM books WHERE asin = ? AND region = ?", (asin, region)
+                    ).fetchone()
+                ):
+                    continue
+                self._insert_book(asin, region, book_response, chapter_response, now, SOURCE_LIBRARY)
+                count += 1
+        return count
+
+    def has_book(self, asin: str, region: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM books WHERE asin = ? AND region = ?", (asin, region)).fetchone()
+        return row is not None
+
+    def get_art(self, url: str) -> bytes | None:
+        """Returns previously downloaded cover art, if present."""
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM art WHERE url = ?", (url,)).fetchone()
+        return row[0] if row is not None else None
+
+    def put_art(self, url: str, data: bytes, fetched_at: float | None = None) -> None:
+        with self._transaction():
+            self._insert_art(url, data, fetched_at or time.time())
+
+    def get_search(self, keywords: str, region: str) -> dict | None:
+        """Returns the cached response of an Audible search, if present."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM searches WHERE keywords = ? AND region = ?", (keywords, region)
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def put_search(self, keywords: str, region: str, response: dict, fetched_at: float | None = None) -> None:
+        """Stores the response of an Audible search, and indexes the products in it for local search."""
+        with self._transaction():
+            self._insert_search(keywords, region, response, fetched_at or time.time())
+
+    def export_bundle(self, path: str) -> dict[str, int]:
+        """
+        Writes all cached books, searches and art to a gzip compressed bundle of JSON lines,
+        which can be loaded into another cache with `import_bundle`. Returns the number of entries of each kind.
+        """
+        counts = {"books": 0, "searches": 0, "art": 0}
+        # A single read transaction makes the bundle consistent even if other processes write to the cache meanwhile
+        with self._transaction(immediate=False), gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps({"format": BUNDLE_FORMAT, "version": BUNDLE_VERSION, "created": time.time()}) + "\n")
+            for asin, region, book, chapters, fetched_at, source in self._conn.execute(
+                "SELECT asin, region, book, chapters, fetched_at, source FROM books"
+            ):
+                record = {"type": "book", "asin": asin, "region": region, "fetched_at": fetched_at, "source": source}
+                f.write(json.dumps({**record, "book": json.loads(book), "chapters": json.loads(chapters)}) + "\n")
+                counts["books"] += 1
+            for keywords, region, response, fetched_at in self._conn.execute(
+                "SELECT keywords, region, response, fetched_at FROM searches"
+            ):
+                record = {"type": "search", "keywords": keywords, "region": region, "fetched_at": fetched_at}
+                f.write(json.dumps({**record, "response": json.loads(response)}) + "\n")
+                counts["searches"] += 1
+            for url, data, fetched_at in self._conn.execute("SELECT url, data, fetched_at FROM art"):
+                record = {"type": "art", "url": url, "fetched_at": fetched_at}
+                f.write(json.dumps({**record, "data": base64.b64encode(data).decode("ascii")}) + "\n")
+                counts["art"] += 1
+        return counts
+
+    def import_bundle(self, path: str) -> dict[str, int]:
+        """Loads a bundle written by `export_bundle` into this cache. Returns the number of entries of each kind."""
+        counts = {"books": 0, "searches": 0, "art": 0}
+        # Load everything in a single transaction, which is much faster than committing each entry
+        with gzip.open(path, "rt", encoding="utf-8") as f, self._transaction():
+            header = json.loads(f.readline() or "{}")
+            if header.get("format") != BUNDLE_FORMAT:
+                raise ValueError(f"{path} is not a cache bundle")
+            if header.get("version", 0) > BUNDLE_VERSION:
+                raise ValueError(f"{path} has version {header['version']}, which is newer than supported")
+            for line in f:
+                r = json.loads(line)
+                if r["type"] == "book":
+                    self._insert_book(
+                        r["asin"],
+                        r["region"],
+                        r["book"],
+                        r["chapters"],
+                        r["fetched_at"],
+                        r.get("source", SOURCE_AUDNEX),
+                    )
+                    counts["books"] += 1
+                elif r["type"] == "search":
+                    self._insert_search(r["keywords"], r["region"], r["response"], r["fetched_at"])
+                    counts["searches"] += 1
+                elif r["type"] == "art":
+                    self._insert_art(r["url"], base64.b64decode(r["data"]), r["fetched_at"])
+                    counts["art"] += 1
+        return counts
+
+    def index_products(self, products: list[dict], region: str) -> None:
+        """Indexes products returned by an Audible catalog search."""
+        with self._transaction():
+            self._index_products(products, region)
+
+    def search(self, query: str, region: str, limit: int = 10) -> list[dict]:
+        """
+        Returns indexed products in the given region matching all words in the query, best matches first.
+        Each result is a dict with the asin, the release date (in yyyy-mm-dd format, or None if unknown)
+        and the indexed text fields, with punctuation removed.
+        """
+        words = re.findall(r"\w+", strip_punctuation(query).lower())
+        if not words:
+            return []
+        # Quote every word so that user input can't be interpreted as FTS5 query syntax
+        match = " ".join(f'"{w}"' for w in words)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT p.asin, p.release_date, s.title, s.subtitle, s.authors, s.narrators, s.series"
+                " FROM search_index s JOIN indexed_products p ON p.id = s.rowid"
+                " WHERE search_index MATCH ? AND s.region = ? ORDER BY s.rank LIMIT ?",
+                (match, region, limit),
+            ).fetchall()
+        return [
+            {
+                "asin": r[0],
+                "release_date": r[1],
+                "title": r[2],
+                "subtitle": r[3],
+                "authors": r[4],
+                "narrators": r[5],
+                "series": r[6],
+            }
+            for r in rows
+        ]
+
+    @contextmanager
+    def _transaction(self, immediate: bool = True):
+        """
+        Runs the body of the `with` statement in a transaction, committed if it succeeds.
+        Immediate transactions take the database's write lock up front, so that a process writing at the same time
+        makes this one wait rather than fail when it goes from reading to writing.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            try:
+                yield
+            except BaseException:
+                self._conn.rollback()
+                raise
+            self._conn.commit()
+
+    def _insert_book(self, asin, region, book_response, chapter_response, fetched_at, source=SOURCE_AUDNEX) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO books (asin, region, book, chapters, fetched_at, source) VALUES (?, ?, ?, ?, ?, ?)",
+            (asin, region, json.dumps(book_response), json.dumps(chapter_response), fetched_at, source),
+        )
+        self._index_book(asin, region, book_response)
+
+    def _insert_search(self, keywords, region, response, fetched_at) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO searches (keywords, region, response, fetched_at) VALUES (?, ?, ?, ?)",
+            (keywords, region, json.dumps(response), fetched_at),
+        )
+        self._index_products(response.get("products", []), region)
+
+    def _insert_art(self, url, data, fetched_at) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO art (url, data, fetched_at) VALUES (?, ?, ?)", (url, data, fetched_at)
+        )
+
+    def _index_book(self, asin, region, book_response) -> None:
+        series = book_response.get("seriesPrimary") or {}
+        self._index(
+            asin=asin,
+            region=region,
+            release_date=(book_response.get("releaseDate") or "")[:10] or None,
+            title=book_response.get("title"),
+            subtitle=book_response.get("subtitle"),
+            authors=[a["name"] for a in book_response.get("authors", [])],
+            narrators=[n["name"] for n in book_response.get("narrators", [])],
+            series=[series["name"]] if series.get("name") else [],
+        )
+
+    def _index_products(self, products, region) -> None:
+        for p in products:
+            self._index(
+                asin=p["asin"],
+                region=region,
+                release_date=p.get("release_date"),
+                title=p.get("title"),
+                subtitle=p.get("subtitle"),
+                authors=[a["name"] for a in p.get("authors") or []],
+                narrators=[n["name"] for n in p.get("narrators") or []],
+                series=[s["title"] for s in p.get("series") or [] if s.get("title")],
+            )
+
+    def _index(self, asin, region, release_date, title, subtitle, authors, narrators, series) -> None:
+        # FTS5 can only look rows up quickly by rowid, so each product's row is keyed by its id in indexed_products
+        self._conn.execute(
+            "INSERT INTO indexed_products (asin, region, release_date) VALUES (?, ?, ?)"
+            " ON CONFLICT (asin, region) DO UPDATE SET release_date = COALESCE(excluded.release_date, release_date)",
+            (asin, region, release_date),
+        )
+        (rowid,) = self._conn.execute(
+            "SELECT id FROM indexed_products WHERE asin = ? AND region = ?", (asin, region)
+        ).fetchone()
+        self._conn.execute("DELETE FROM search_index WHERE rowid = ?", (rowid,))
+        self._conn.execute(
+            "INSERT INTO search_index (rowid, asin, region, title, subtitle, authors, narrators, series)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                rowid,
+                asin,
+                region,
+                strip_punctuation(title or ""),
+                strip_punctuation(subtitle or ""),
+                ", ".join(strip_punctuation(a) for a in authors),
+                ", ".join(strip_punctuation(n) for n in narrators),
+                ", ".join(strip_punctuation(s) for s in series),
+            ),
+        )
+
+
+def strip_punctuation(text: str) -> str:
+    """
+    Removes punctuation so that e.g "Wizard's" is indexed as "wizards" rather than "wizard" and "s",
+    matching how queries are normalized.
+    """
+    return re.sub(r"[^\w\s]", "", text)
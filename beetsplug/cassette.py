@@ -0,0 +1,138 @@
+import base64
+import email.message
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import defaultdict
+from time import perf_counter, sleep
+from urllib import parse, request
+from urllib.error import HTTPError, URLError
+from urllib.response import addinfourl
+
+# Query parameters which are secrets, and so are neither recorded nor used to match requests
+REDACTED_PARAMS = ("key",)
+
+
+class Cassette:
+    """
+    Records every HTTP response (status, headers, body and how long it took) to files in a folder,
+    or replays recorded responses without touching the network.
+    When disabled, requests go straight to the network.
+    """
+
+    def __init__(self):
+        self.mode = None
+        self.directory = None
+        self.simulate_latency = False
+        self._lock = threading.Lock()
+        # Number of times each recorded url has been requested, so that responses are replayed in order
+        self._positions = defaultdict(int)
+        self._recordings = {}
+
+    def enable(self, directory: str, mode: str, simulate_latency: bool = False) -> None:
+        if mode not in ("record", "replay"):
+            raise ValueError(f"invalid cassette mode {mode!r}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.mode = mode
+        self.simulate_latency = simulate_latency
+
+    def open_url(self, req: request.Request):
+        """Like `urllib.request.urlopen`, but records or replays the response if enabled."""
+        if self.mode == "replay":
+            return self.replay(req.full_url)
+        if self.mode == "record":
+            return self.record(req)
+        return request.urlopen(req)
+
+    def sleep(self, seconds: float) -> None:
+        """Waits before retrying a request, unless replaying at full speed."""
+        if self.mode != "replay" or self.simulate_latency:
+            sleep(seconds)
+
+    def record(self, req: request.Request):
+        start = perf_counter()
+        try:
+            with request.urlopen(req) as response:
+                body = response.read()
+            status, reason, headers = response.status, response.reason, response.headers
+        except HTTPError as e:
+            body = e.read()
+            status, reason, headers = e.code, e.reason, e.headers
+        elapsed = perf_counter() - start
+
+        interaction = {
+            "url": redact_url(req.full_url),
+            "status": status,
+            "reason": reason,
+            "headers": list(headers.items()) if headers else [],
+            "elapsed": elapsed,
+        }
+        try:
+            interaction["body"] = body.decode("utf-8")
+        except UnicodeDecodeError:
+            interaction["body_base64"] = base64.b64encode(body).decode("ascii")
+
+        path = self.path_for(req.full_url)
+        with self._lock:
+            recordings = self._load(path)
+            recordings.append(interaction)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(recordings, f, indent=2)
+        return to_response(req.full_url, interaction, body)
+
+    def replay(self, url: str):
+        path = self.path_for(url)
+        with self._lock:
+            recordings = self._load(path)
+            if not recordings:
+                raise URLError(f"no recorded response for {redact_url(url)}")
+            # Replay recordings in the order they were made, repeating the last one once they run out
+            position = min(self._positions[path], len(recordings) - 1)
+            self._positions[path] += 1
+        interaction = recordings[position]
+        if self.simulate_latency:
+            sleep(interaction["elapsed"])
+
+        if "body_base64" in interaction:
+            body = base64.b64decode(interaction["body_base64"])
+        else:
+            body = interaction["body"].encode("utf-8")
+        return to_response(url, interaction, body)
+
+    def path_for(self, url: str) -> str:
+        redacted = redact_url(url)
+        digest = hashlib.sha256(redacted.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, parse.urlsplit(redacted).netloc, f"{digest}.json")
+
+    def _load(self, path: str) -> list[dict]:
+        if path not in self._recordings:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self._recordings[path] = json.load(f)
+            except FileNotFoundError:
+                self._recordings[path] = []
+        return self._recordings[path]
+
+
+def redact_url(url: str) -> str:
+    parts = parse.urlsplit(url)
+    query = [(k, v) for k, v in parse.parse_qsl(parts.query, keep_blank_values=True) if k not in REDACTED_PARAMS]
+    return parse.urlunsplit(parts._replace(query=parse.urlencode(query)))
+
+
+def to_response(url: str, interaction: dict, body: bytes):
+    """Returns a response object like those returned by urlopen, raising an `HTTPError` for error statuses."""
+    headers = email.message.Message()
+    for name, value in interaction["headers"]:
+        headers[name] = value
+    if interaction["status"] >= 400:
+        raise HTTPError(url, interaction["status"], interaction["reason"], headers, io.BytesIO(body))
+    return addinfourl(io.BytesIO(body), headers, url, interaction["status"])
+
+
+# Requests made by the API functions go through this instance
+cassette = Cassette()
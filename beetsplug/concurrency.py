@@ -0,0 +1,113 @@
+import threading
+from contextlib import contextmanager
+from time import perf_counter
+from urllib.error import HTTPError
+
+from .metrics import metrics
+
+INITIAL_LIMIT = 2
+MIN_LIMIT = 1
+# Multiplier applied to the limit when a host responds with 429 or a 5xx status, or a request fails without a response
+DECREASE_FACTOR = 0.5
+# Requests slower than this multiple of the baseline latency don't increase the limit
+LATENCY_TOLERANCE = 2.0
+# How quickly the baseline latency follows slower responses, so that it adapts to a host getting slower
+BASELINE_DRIFT = 0.05
+
+
+class HostLimiter:
+    """
+    Limits the number of requests in flight to a single host, adjusting the limit with AIMD:
+    it grows by one every `limit` requests while latency stays close to its baseline,
+    and is halved when the host responds with 429 or a 5xx status, or a request to it fails without a response.
+    """
+
+    def __init__(self, host: str, maximum: int):
+        self.host = host
+        self.maximum = maximum
+        self.limit = float(min(INITIAL_LIMIT, maximum))
+        self.in_flight = 0
+        self.baseline = None
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        metrics.set("concurrency_limit", self.limit, host=host)
+
+    def acquire(self) -> float:
+        """Waits until another request may be made, returning the time it started."""
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+        return perf_counter()
+
+    def release(self, start: float, overloaded: bool) -> None:
+        latency = perf_counter() - start
+        with self._cond:
+            # Only grow the limit when it's being reached, otherwise it says nothing about the host's capacity
+            saturated = self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+            previous = self.limit
+            if overloaded:
+                # Requests that were already in flight when the limit was decreased don't decrease it again
+                if start >= self._last_decrease:
+                    self.limit = max(MIN_LIMIT, self.limit * DECREASE_FACTOR)
+                    self._last_decrease = perf_counter()
+            else:
+                if self.baseline is None or latency < self.baseline:
+                    self.baseline = latency
+                else:
+                    self.baseline += (latency - self.baseline) * BASELINE_DRIFT
+                if saturated and latency <= self.baseline * LATENCY_TOLERANCE:
+                    self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+            changed = int(self.limit) != int(previous) or self.limit < previous
+        if changed:
+            metrics.set("concurrency_limit", round(self.limit, 2), host=self.host)
+
+
+class AdaptiveConcurrency:
+    """
+    Per host limits on the number of concurrent requests, which adapt to how much load each host can take.
+    Requests are not limited unless enabled.
+    """
+
+    def __init__(self):
+        self.maximum = None
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def enable(self, maximum: int) -> None:
+        self.maximum = maximum
+
+    @contextmanager
+    def slot(self, host: str):
+        """Waits for the host's limit to allow another request, which is made in the body of the `with` statement."""
+        if self.maximum is None:
+            yield
+            return
+
+        limiter = self.limiter(host)
+        start = limiter.acquire()
+        overloaded = False
+        try:
+            yield
+        except HTTPError as e:
+            overloaded = e.code == 429 or e.code >= 500
+            raise
+        except OSError:
+            # Connection errors and timeouts are often a sign of an overloaded host, and their latency isn't that of
+            # a response, so they must not count as successful requests
+            overloaded = True
+            raise
+        finally:
+            limiter.release(start, overloaded)
+
+    def limiter(self, host: str) -> HostLimiter:
+        with self._lock:
+            if host not in self._limiters:
+                self._limiters[host] = HostLimiter(host, self.maximum)
+            return self._limiters[host]
+
+
+# Requests made by the API functions are limited by this instance
+concurrency = AdaptiveConcurrency()
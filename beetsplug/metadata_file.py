@@ -0,0 +1,94 @@
+import copy
+import datetime
+import json
+import os
+from functools import lru_cache
+
+import yaml
+
+# Use the much faster libyaml based loader when PyYAML was built with it
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+METADATA_FILE_NAMES = ("metadata.yml", "metadata.json")
+# Text fields, with whether they must have a value. Numbers, e.g `title: 1984`, are converted to text
+TEXT_FIELDS = {
+    "title": True,
+    "description": False,
+    "publisher": False,
+    "language": False,
+    "subtitle": False,
+    "series": False,
+}
+LIST_FIELDS = ("authors", "narrators", "genres")
+REQUIRED_FIELDS = ("title", "authors", "narrators", "description", "genres", "releaseDate", "publisher")
+SCALAR_TYPES = (str, int, float)
+
+
+def find_metadata_file(folder: str) -> str | None:
+    """Returns the path of the metadata.yml or metadata.json file in a folder, if one exists."""
+    for name in METADATA_FILE_NAMES:
+        path = os.path.join(folder, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def load_metadata_file(path: str) -> dict:
+    """
+    Returns the validated contents of a metadata file.
+    Parsed files are reused for as long as their modification time and size don't change.
+    """
+    stat = os.stat(path)
+    # Callers get their own copy, since the parsed metadata ends up in AlbumInfo objects that beets modifies
+    return copy.deepcopy(_load_metadata_file(path, stat.st_mtime_ns, stat.st_size))
+
+
+@lru_cache(maxsize=1024)
+def _load_metadata_file(path: str, mtime_ns: int, size: int) -> dict:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f) if path.endswith(".json") else yaml.load(f, Loader=YAML_LOADER)
+    return validate_metadata(data)
+
+
+def validate_metadata(data) -> dict:
+    """
+    Checks that metadata has all required fields with usable values, raising a `ValueError` if not.
+    Returns a copy of the metadata with numbers in text fields converted to text and the release date parsed.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("metadata must be a mapping of fields to values")
+    data = dict(data)
+
+    for field in REQUIRED_FIELDS:
+        if field not in data:
+            raise ValueError(f"missing required field {field!r}")
+
+    # JSON has no date type, so accept ISO 8601 strings there
+    release_date = data["releaseDate"]
+    if isinstance(release_date, str):
+        try:
+            data["releaseDate"] = datetime.date.fromisoformat(release_date[:10])
+        except ValueError:
+            raise ValueError(f"releaseDate {release_date!r} is not a yyyy-mm-dd date") from None
+    elif not isinstance(release_date, datetime.date):
+        raise ValueError(f"field 'releaseDate' has an invalid value {release_date!r}")
+
+    for field, is_required in TEXT_FIELDS.items():
+        value = data.get(field)
+        if value is None:
+            if is_required:
+                raise ValueError(f"field {field!r} must have a value")
+        elif isinstance(value, SCALAR_TYPES) and not isinstance(value, bool):
+            data[field] = str(value)
+        else:
+            raise ValueError(f"field {field!r} has an invalid value {value!r}")
+    for field in LIST_FIELDS:
+        values = data[field]
+        if not isinstance(values, list) or not all(
+            isinstance(v, SCALAR_TYPES) and not isinstance(v, bool) for v in values
+        ):
+            raise ValueError(f"field {field!r} must be a list of strings")
+        data[field] = [str(v) for v in values]
+    position = data.get("seriesPosition")
+    if position is not None and (not isinstance(position, SCALAR_TYPES) or isinstance(position, bool)):
+        raise ValueError(f"field 'seriesPosition' has an invalid value {position!r}")
+    return data
@@ -0,0 +1,264 @@
+import functools
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from time import perf_counter
+
+from .tracing import tracer
+
+METRIC_PREFIX = "beets_audible_"
+# Upper bounds of histogram buckets, in seconds
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, math.inf)
+# Number of past values kept for each gauge
+HISTORY_LENGTH = 1000
+
+
+class Histogram:
+    counts: list[int]
+    count: int
+    sum: float
+    max: float
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+
+class Metrics:
+    """
+    Thread-safe counters, histograms and gauges, identified by a name and a set of labels.
+    Gauges also keep a history of their values.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.histograms = defaultdict(Histogram)
+        self.gauges = {}
+        self.gauge_history = defaultdict(list)
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        with self._lock:
+            self.counters[(name, _freeze(labels))] += value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self.histograms[(name, _freeze(labels))].observe(value)
+
+    def set(self, name: str, value: float, **labels) -> None:
+        key = (name, _freeze(labels))
+        with self._lock:
+            self.gauges[key] = value
+            history = self.gauge_history[key]
+            history.append((time.time(), value))
+            if len(history) > HISTORY_LENGTH:
+                del history[0]
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Records the time taken by the body of the `with` statement in the named histogram."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, perf_counter() - start, **labels)
+
+    @contextmanager
+    def stage(self, stage: str):
+        """Times a stage of looking up or importing books, also recording it as a trace span."""
+        with tracer.span(stage), self.timer("stage_seconds", stage=stage):
+            yield
+
+    def record_request(self, host: str, endpoint: str, status, seconds: float, size: int) -> None:
+        self.inc("requests_total", host=host, endpoint=endpoint, status=str(status))
+        self.inc("request_bytes_total", size, host=host, endpoint=endpoint)
+        self.observe("request_seconds", seconds, host=host, endpoint=endpoint)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.gauges.clear()
+            self.gauge_history.clear()
+
+    def summary(self) -> dict:
+        """Returns all metrics as a JSON-serializable dict."""
+        with self._lock:
+            return {
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ],
+                "histograms": [
+                    {
+                        "name": name,
+                        "labels": dict(labels),
+                        "count": h.count,
+                        "sum": h.sum,
+                        "max": h.max,
+                        "buckets": {_format_bound(b): c for b, c in zip(BUCKETS, h.counts, strict=True)},
+                    }
+                    for (name, labels), h in sorted(self.histograms.items())
+                ],
+                "gauges": [
+                    {
+                        "name": name,
+                        "labels": dict(labels),
+                        "value": value,
+                        "history": [list(point) for point in self.gauge_history[(name, labels)]],
+                    }
+                    for (name, labels), value in sorted(self.gauges.items())
+                ],
+            }
+
+    def to_prometheus(self) -> str:
+        """
+        Returns all metrics in the Prometheus text exposition format,
+        e.g for the node exporter's textfile collector.
+        """
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {METRIC_PREFIX}{name} counter")
+                for (n, labels), value in sorted(self.counters.items()):
+                    if n == name:
+                        lines.append(f"{METRIC_PREFIX}{name}{_format_labels(labels)} {value:g}")
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {METRIC_PREFIX}{name} histogram")
+                for (n, labels), h in sorted(self.histograms.items()):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS, h.counts, strict=True):
+                        cumulative += count
+                        bucket_labels = (*labels, ("le", _format_bound(bound)))
+                        lines.append(f"{METRIC_PREFIX}{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                    lines.append(f"{METRIC_PREFIX}{name}_sum{_format_labels(labels)} {h.sum:g}")
+                    lines.append(f"{METRIC_PREFIX}{name}_count{_format_labels(labels)} {h.count}")
+            for name in sorted({name for name, _ in self.gauges}):
+                lines.append(f"# TYPE {METRIC_PREFIX}{name} gauge")
+                for (n, labels), value in sorted(self.gauges.items()):
+                    if n == name:
+                        lines.append(f"{METRIC_PREFIX}{name}{_format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str, fmt: str = "json") -> None:
+        """Writes all metrics to a file, in either "json" or "prometheus" format."""
+        content = self.to_prometheus() if fmt == "prometheus" else json.dumps(self.summary(), indent=2)
+        # Write to a temporary file first, so that collectors never see a partially written file
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(temp_path, path)
+
+
+def format_summary(summary: dict) -> str:
+    """Formats a summary returned by `Metrics.summary` as human readable tables."""
+    counters = defaultdict(float)
+    for c in summary["counters"]:
+        labels = c["labels"]
+        if c["name"] == "requests_total" and labels["status"] == "429":
+            counters[("429s", labels["host"], labels["endpoint"])] += c["value"]
+        elif c["name"] in ("request_bytes_total", "request_retries_total"):
+            counters[(c["name"], labels["host"], labels["endpoint"])] += c["value"]
+        elif c["name"] in ("cache_hits_total", "cache_misses_total"):
+            counters[(c["name"], labels["kind"])] += c["value"]
+
+    lines = ["Requests:"]
+    request_histograms = [h for h in summary["histograms"] if h["name"] == "request_seconds"]
+    if not request_histograms:
+        lines.append("  none")
+    for h in request_histograms:
+        host, endpoint = h["labels"]["host"], h["labels"]["endpoint"]
+        lines.append(
+            f"  {host}{endpoint}: {h['count']} requests, mean {_mean(h):.3f}s, max {h['max']:.3f}s,"
+            f" {counters[('request_bytes_total', host, endpoint)]:.0f} bytes,"
+            f" {counters[('request_retries_total', host, endpoint)]:.0f} retries,"
+            f" {counters[('429s', host, endpoint)]:.0f} rate limited"
+        )
+
+    lines.append("Cache:")
+    kinds = sorted({k[1] for k in counters if k[0] in ("cache_hits_total", "cache_misses_total")})
+    if not kinds:
+        lines.append("  not used")
+    for kind in kinds:
+        hits, misses = counters[("cache_hits_total", kind)], counters[("cache_misses_total", kind)]
+        lines.append(f"  {kind}: {hits:.0f} hits, {misses:.0f} misses")
+
+    lines.append("Stages:")
+    stage_histograms = [h for h in summary["histograms"] if h["name"] == "stage_seconds"]
+    if not stage_histograms:
+        lines.append("  none")
+    for h in stage_histograms:
+        lines.append(
+            f"  {h['labels']['stage']}: {h['count']} calls, total {h['sum']:.3f}s,"
+            f" mean {_mean(h):.3f}s, max {h['max']:.3f}s"
+        )
+
+    # Summaries written before gauges were added don't have them
+    limits = [g for g in summary.get("gauges", []) if g["name"] == "concurrency_limit"]
+    if limits:
+        lines.append("Concurrency limits:")
+    for g in limits:
+        values = [v for _, v in g["history"]] or [g["value"]]
+        lines.append(
+            f"  {g['labels']['host']}: {g['value']:g} at the end, between {min(values):g} and {max(values):g},"
+            f" {len(values) - 1} changes"
+        )
+    return "\n".join(lines)
+
+
+def timed(stage: str):
+    """Decorator recording the time taken by each call of the decorated function as the named stage."""
+
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            with metrics.stage(stage):
+                return f(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _mean(h: dict) -> float:
+    return h["sum"] / h["count"] if h["count"] else 0.0
+
+
+def _freeze(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == math.inf else f"{bound:g}"
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    escaped = (f'{k}="{_escape_label_value(str(v))}"' for k, v in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Metrics are collected into this instance by the API functions and the plugin
+metrics = Metrics()
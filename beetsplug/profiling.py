@@ -0,0 +1,96 @@
+import cProfile
+import functools
+import os
+import pstats
+import re
+import threading
+import time
+
+
+class Profiler:
+    """
+    Profiles calls of the plugin's entry points with cProfile, saving a .prof file per call
+    or a single file with the aggregated stats of all calls. Nothing is profiled unless the profiler is enabled.
+    Since Python 3.12, only one cProfile profiler can be active in a process at a time, so profiled calls
+    from different threads run one after the other.
+    """
+
+    def __init__(self):
+        self.directory = None
+        self.aggregate = False
+        self.stats = None
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._thread = threading.local()
+
+    def enable(self, directory: str, aggregate: bool = False) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.aggregate = aggregate
+
+    def run(self, entry_point: str, label: str, f, *args, **kwargs):
+        if self.directory is None:
+            return f(*args, **kwargs)
+
+        # Entry points called from a profiled call are part of its profile
+        if getattr(self._thread, "is_profiling", False):
+            return f(*args, **kwargs)
+
+        profile = cProfile.Profile()
+        with self._run_lock:
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiling tool, e.g one the user started, is already active
+                return f(*args, **kwargs)
+            self._thread.is_profiling = True
+            try:
+                return f(*args, **kwargs)
+            finally:
+                profile.disable()
+                self._thread.is_profiling = False
+                self.save(profile, entry_point, label)
+
+    def save(self, profile: cProfile.Profile, entry_point: str, label: str) -> None:
+        if self.aggregate:
+            with self._lock:
+                if self.stats is None:
+                    self.stats = pstats.Stats(profile)
+                else:
+                    self.stats.add(profile)
+            return
+
+        safe_label = re.sub(r"[^\w.-]+", "_", label)[:100]
+        profile.dump_stats(os.path.join(self.directory, f"{entry_point}-{safe_label}-{time.time_ns()}.prof"))
+
+    def write_aggregate(self) -> None:
+        """Saves the aggregated stats of all profiled calls, if profiling in aggregate mode."""
+        with self._lock:
+            if self.stats is not None:
+                self.stats.dump_stats(os.path.join(self.directory, "aggregate.prof"))
+
+
+def profiled(entry_point: str, get_label):
+    """
+    Decorator profiling calls of the decorated function when profiling is enabled.
+    `get_label` is called with the function's arguments, and returns a label for the call such as the asin or folder,
+    used to name the output file.
+    """
+
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            if profiler.directory is None:
+                return f(*args, **kwargs)
+            try:
+                label = str(get_label(*args, **kwargs))
+            except Exception:
+                label = "unknown"
+            return profiler.run(entry_point, label, f, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+profiler = Profiler()
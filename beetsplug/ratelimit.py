@@ -0,0 +1,74 @@
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hosts (
+    host TEXT PRIMARY KEY,
+    next_at REAL NOT NULL
+);
+"""
+# Seconds to wait for other processes to finish updating the shared state
+BUSY_TIMEOUT = 60
+
+
+class RateLimiter:
+    """
+    Spaces out requests to each host, so that all processes sharing the same state file together make
+    at most `rate` requests per second to it. The state is the time at which each host may next be requested,
+    kept in a SQLite database so that it is shared by every process importing at the same time.
+    Requests are not limited unless enabled.
+    """
+
+    def __init__(self):
+        self.rate = None
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def enable(self, path: str, rate: float) -> None:
+        if rate <= 0:
+            raise ValueError(f"invalid rate limit {rate}")
+        self.rate = rate
+        self._conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.executescript(SCHEMA)
+
+    def reserve(self, host: str) -> float:
+        """Reserves the next free slot for a request to the host, returning the number of seconds until it."""
+        with self._lock:
+            # Taking the write lock up front serializes reservations across processes
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._conn.execute("SELECT next_at FROM hosts WHERE host = ?", (host,)).fetchone()
+                slot = max(now, row[0]) if row is not None else now
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO hosts (host, next_at) VALUES (?, ?)", (host, slot + 1 / self.rate)
+                )
+            except BaseException:
+                self._conn.rollback()
+                raise
+            self._conn.commit()
+        return slot - now
+
+    def pause(self, host: str, seconds: float) -> None:
+        """Stops every process from requesting the host for the given number of seconds, e.g when rate limited."""
+        if self.rate is None:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO hosts (host, next_at) VALUES (?, ?)"
+                " ON CONFLICT (host) DO UPDATE SET next_at = MAX(next_at, excluded.next_at)",
+                (host, time.time() + seconds),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                self.rate = None
+
+
+# Requests made by the API functions are limited by this instance
+rate_limiter = RateLimiter()
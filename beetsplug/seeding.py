@@ -0,0 +1,71 @@
+import html
+
+from beets import util
+
+
+def responses_from_library_album(album, get_region) -> tuple[str, str, dict, dict] | None:
+    """
+    Rebuilds the Audnex book and chapter responses of an imported book from what the library stores about it,
+    returning (asin, region, book response, chapter response), or None if the album lacks the data needed.
+    `get_region` is called with the album's first item and returns the region the book was matched in.
+    The chapters are the album's items, so they match the files even if tracks were aligned with them on import.
+    Data the library doesn't store, such as the cover art url and the series asin, is left empty.
+    """
+    items = sorted(album.items(), key=lambda i: (i.disc, i.track, util.bytestring_path(i.path)))
+    asin = album.get("mb_albumid") or album.get("asin")
+    if not items or not asin or not album.get("year"):
+        return None
+    first = items[0]
+    region = get_region(first)
+
+    series = None
+    if first.get("series_name"):
+        series = {"asin": None, "name": first["series_name"], "position": first.get("series_position") or None}
+    authors = album.get("albumartist") or first.get("artist") or ""
+    narrators = first.get("composers") or [n for n in (first.get("composer") or "").split(", ") if n]
+    runtime_ms = int(sum(i.length for i in items) * 1000)
+
+    book = {
+        "asin": asin,
+        "authors": [{"asin": None, "name": a} for a in authors.split(", ") if a],
+        "description": "",
+        "formatType": "unabridged",
+        "genres": [{"asin": None, "name": g, "type": "genre"} for g in album.get("genres") or []],
+        "image": "",
+        "language": album.get("language") or "",
+        "narrators": [{"name": n} for n in narrators],
+        "publisherName": album.get("label") or "",
+        "releaseDate": f"{album['year']:04d}-{album.get('month') or 1:02d}-{album.get('day') or 1:02d}",
+        "runtimeLengthMin": runtime_ms // 60000,
+        "seriesPrimary": series,
+        "subtitle": first.get("subtitle") or None,
+        # The library only keeps the summary converted to markdown, which is used as is instead of converting it
+        "summary": html.escape(first.get("comments") or ""),
+        "summaryMarkdown": first.get("comments") or "",
+        "title": album.get("album") or first.title,
+        "region": region,
+    }
+
+    chapters = []
+    offset_ms = 0
+    for item in items:
+        length_ms = int(item.length * 1000)
+        chapters.append(
+            {
+                "lengthMs": length_ms,
+                "startOffsetMs": offset_ms,
+                "startOffsetSec": offset_ms // 1000,
+                "title": item.title,
+            }
+        )
+        offset_ms += length_ms
+    chapter_info = {
+        "asin": asin,
+        "brandIntroDurationMs": 0,
+        "brandOutroDurationMs": 0,
+        "chapters": chapters,
+        "isAccurate": True,
+        "runtimeLengthMs": runtime_ms,
+        "runtimeLengthSec": runtime_ms // 1000,
+    }
+    return asin, region, book, chapter_info
@@ -0,0 +1,123 @@
+import fnmatch
+import glob
+import os
+import re
+import subprocess
+import sys
+
+import yaml
+from beets import config
+from beets.importer.tasks import MULTIDISC_PATTERNS
+
+# Paths which beets would misread from an import log, since it splits lines on "; " to read books in several folders
+UNLOGGABLE_PATH = re.compile(r"; |[\r\n]")
+
+
+def find_shard_entries(paths: list[str], split_files: bool = False) -> tuple[list[str], list[str]]:
+    """
+    Returns the folders and files to split between import workers: the subfolders of each path,
+    or the path itself if it's a file, has no subfolders or is a book split into disc folders.
+    Entries are never nested in each other, so no file is imported twice.
+    Like beets, the files at the top of a path with subfolders are a single book, so the paths with such files are
+    returned separately, for their files to be imported together. With `split_files`, each of these files is an entry
+    of its own instead, for folders of single file books.
+    """
+    ignore = config["ignore"].as_str_seq()
+    entries = []
+    loose_file_folders = []
+    for path in paths:
+        if not os.path.isdir(path):
+            entries.append(path)
+            continue
+        with os.scandir(path) as it:
+            children = [e for e in it if not any(fnmatch.fnmatch(e.name, pattern) for pattern in ignore)]
+        subfolders = sorted(e.path for e in children if e.is_dir())
+        if not subfolders or is_multi_disc_book(subfolders):
+            entries.append(path)
+            continue
+        entries.extend(subfolders)
+        files = sorted(e.path for e in children if not e.is_dir())
+        if split_files:
+            entries.extend(files)
+        elif files:
+            loose_file_folders.append(path)
+    return entries, loose_file_folders
+
+
+def is_multi_disc_book(subfolders: list[str]) -> bool:
+    """
+    Returns whether folders are the discs of a single book, e.g "Disc 1" and "Disc 2",
+    which beets imports as one album when they're imported together.
+    """
+    names = [os.fsencode(os.path.basename(f)) for f in subfolders]
+    for pattern in MULTIDISC_PATTERNS:
+        match = pattern.match(names[0])
+        if match:
+            # Like beets, the first folder's name dictates the pattern of the others
+            prefix = re.compile(b"^" + re.escape(match.group(1)) + rb"\d", re.I)
+            return all(prefix.match(n) for n in names)
+    return False
+
+
+def split_into_shards(entries: list[str], count: int) -> list[list[str]]:
+    """Deals the entries out to `count` shards in turn, so that shards have similar numbers of folders."""
+    shards = [entries[i::count] for i in range(count)]
+    return [s for s in shards if s]
+
+
+def write_shard_file(path: str, entries: list[str]) -> list[str]:
+    """
+    Writes the folders of a shard in the format of a beets import log, to be passed to `--from-logfile`.
+    Returns the folders which can't be written to the log, to be passed as arguments instead.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        for entry in entries:
+            if not UNLOGGABLE_PATH.search(entry):
+                f.write(f"skip {entry}\n")
+    return [e for e in entries if UNLOGGABLE_PATH.search(e)]
+
+
+def write_loose_files_config(path: str, folder: str) -> None:
+    """
+    Writes a beets configuration file ignoring the subfolders of a folder, so that importing the folder only imports
+    the files at its top.
+    """
+    with os.scandir(folder) as it:
+        subfolders = sorted(glob.escape(e.name) for e in it if e.is_dir())
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump({"ignore": config["ignore"].as_str_seq() + subfolders}, f)
+
+
+def get_worker_command(
+    shard_path: str | None, import_args: list[str], paths: list[str], config_path: str | None = None
+) -> list[str]:
+    """
+    Returns the command running `beet import` on a shard and the given paths, with the same configuration as this
+    process and the configuration file at `config_path`.
+    """
+    global_args = ["-l", config["library"].as_filename(), "-d", config["directory"].as_filename()]
+    user_config_path = config.user_config_path()
+    for source in config.sources:
+        if source.filename and not source.default and source.filename != user_config_path:
+            global_args += ["-c", source.filename]
+    if config_path:
+        global_args += ["-c", config_path]
+    return [
+        sys.executable,
+        "-m",
+        "beets",
+        *global_args,
+        "import",
+        # Workers can't prompt the user, since they run at the same time
+        "--quiet",
+        *(["--from-logfile", shard_path] if shard_path else []),
+        *import_args,
+        "--",
+        *paths,
+    ]
+
+
+def run_workers(commands: list[list[str]]) -> list[int]:
+    """Runs the commands at the same time, returning their exit codes once all of them have finished."""
+    processes = [subprocess.Popen(command) for command in commands]
+    return [p.wait() for p in processes]
@@ -0,0 +1,83 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from time import perf_counter
+
+
+class Tracer:
+    """
+    Records nested spans of work as events in the Chrome trace-event format,
+    which can be viewed with Perfetto (https://ui.perfetto.dev) or chrome://tracing.
+    Nothing is recorded unless the tracer is enabled.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._start = perf_counter()
+        self._thread_names = {}
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    @contextmanager
+    def span(self, name: str, **args):
+        """
+        Records the time taken by the body of the `with` statement as a span with the given arguments,
+        along with the exception raised by it, if any.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        stack = self._stack()
+        stack.append(args)
+        start = perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            args["error"] = repr(e)
+            raise
+        finally:
+            end = perf_counter()
+            stack.pop()
+            thread = threading.current_thread()
+            event = {
+                "name": name,
+                "ph": "X",
+                "ts": (start - self._start) * 1e6,
+                "dur": (end - start) * 1e6,
+                "pid": os.getpid(),
+                "tid": thread.ident,
+                "args": {k: str(v) for k, v in args.items()},
+            }
+            with self._lock:
+                self.events.append(event)
+                self._thread_names[thread.ident] = thread.name
+
+    def annotate(self, **args) -> None:
+        """Adds arguments, e.g the asin being looked up, to the innermost span of the current thread."""
+        if self.enabled and self._stack():
+            self._stack()[-1].update(args)
+
+    def write(self, path: str) -> None:
+        with self._lock:
+            thread_names = [
+                {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+                for tid, name in self._thread_names.items()
+            ]
+            trace = {"traceEvents": thread_names + self.events, "displayTimeUnit": "ms"}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(trace, f)
+
+    def _stack(self) -> list[dict]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+
+# Spans are recorded into this instance by the API functions and the plugin
+tracer = Tracer()
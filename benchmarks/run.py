@@ -0,0 +1,195 @@
+"""
+Benchmarks the plugin's hot paths offline, using the recorded API responses in the fixtures folder.
+
+Usage: python -m benchmarks.run [--output results.json] [--compare baseline.json]
+"""
+
+import argparse
+import copy
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+from importlib.metadata import PackageNotFoundError, version
+from time import perf_counter
+from types import SimpleNamespace
+
+# Keep the benchmarks independent of the user's beets configuration
+os.environ["BEETSDIR"] = tempfile.mkdtemp(prefix="beets-audible-bench-")
+
+from beets import config
+from beets.library import Item
+
+from beetsplug.audible import Audible
+from beetsplug.book import Book, BookChapters
+
+from .stub_server import StubServer, load_fixture
+
+
+def bench(name: str, func, iterations: int, setup=None) -> dict:
+    """
+    Calls `func` `iterations` times after a warmup call and returns timing statistics in seconds.
+    If given, `setup` is called before each call, untimed, and its result is passed to `func`.
+    """
+    func(*(setup() if setup else ()))
+    timings = []
+    for _ in range(iterations):
+        args = setup() if setup else ()
+        start = perf_counter()
+        func(*args)
+        timings.append(perf_counter() - start)
+    return {
+        "name": name,
+        "iterations": iterations,
+        "mean": statistics.mean(timings),
+        "median": statistics.median(timings),
+        "min": min(timings),
+        "max": max(timings),
+        "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+    }
+
+
+def make_items(count: int) -> list[Item]:
+    """Returns items as if importing a folder of `count` files, in reverse order to exercise sorting."""
+    return [
+        Item(path=f"/audiobooks/Wizard's First Rule/{i:03d} - Part {i}.mp3".encode(), title=f"Part {i}", length=300.0)
+        for i in range(count, 0, -1)
+    ]
+
+
+def run_benchmarks(latency: float, scale: float, selected: set[str] | None) -> list[dict]:
+    config["audible"]["goodreads_apikey"] = "bench"
+    plugin = Audible()
+    book_response = load_fixture("audnex_book.json")
+    large_chapters_response = load_fixture("audnex_chapters_large.json")
+
+    server = StubServer()
+    server.start()
+    server.patch_endpoints()
+
+    # A book with fewer chapters than files, so that tracks have to be aligned with files
+    server.large_book_asins = set()
+    album_info = plugin.get_album_info("B0BENCH001", "us")
+    server.large_book_asins = {"B0BENCH000"}
+
+    def iterations(n: int) -> int:
+        return max(1, int(n * scale))
+
+    benchmarks = {
+        "book_from_audnex_book": lambda: bench(
+            "book_from_audnex_book", lambda: Book.from_audnex_book(book_response), iterations(200)
+        ),
+        "book_chapters_from_audnex_chapter_info_320": lambda: bench(
+            "book_chapters_from_audnex_chapter_info_320",
+            lambda: BookChapters.from_audnex_chapter_info(large_chapters_response),
+            iterations(200),
+        ),
+        "get_album_info_320_chapters": lambda: bench(
+            "get_album_info_320_chapters", lambda: plugin.get_album_info("B0BENCH000", "us"), iterations(20)
+        ),
+        "candidates_end_to_end": lambda: bench(
+            "candidates_end_to_end",
+            lambda items: plugin.candidates(items, "Terry Goodkind", "Wizard's First Rule", False),
+            iterations(5),
+            setup=lambda: forget_candidates(plugin, make_items(42)),
+        ),
+        "maybe_align_tracks_with_items_320_items": lambda: bench(
+            "maybe_align_tracks_with_items_320_items",
+            lambda info, items: plugin.maybe_align_tracks_with_items(info, items),
+            iterations(20),
+            setup=lambda: (copy.deepcopy(album_info), make_items(320)),
+        ),
+        "on_album_matched_320_items": lambda: bench(
+            "on_album_matched_320_items",
+            lambda match: plugin.on_album_matched(match),
+            iterations(3),
+            setup=lambda: (make_match(album_info, make_items(320)),),
+        ),
+    }
+
+    results = []
+    try:
+        for name, run in benchmarks.items():
+            if selected and name not in selected:
+                continue
+            server.latency = latency if name == "candidates_end_to_end" else 0.0
+            result = run()
+            print(f"{name}: mean {result['mean'] * 1000:.2f}ms over {result['iterations']} runs", file=sys.stderr)
+            results.append(result)
+    finally:
+        server.stop()
+    return results
+
+
+def forget_candidates(plugin: Audible, items: list[Item]) -> tuple[list[Item]]:
+    """Drops the plugin's memoized candidates, so that every call of `candidates` looks the book up again."""
+    with plugin.candidate_memo_lock:
+        plugin.candidate_memo.clear()
+    return (items,)
+
+
+def make_match(album_info, items) -> SimpleNamespace:
+    """Returns an object with the attributes of an AlbumMatch that `on_album_matched` uses."""
+    return SimpleNamespace(
+        info=copy.deepcopy(album_info),
+        items=items[: len(album_info.tracks)],
+        extra_items=items[len(album_info.tracks) :],
+        mapping={},
+        extra_tracks=[],
+        distance=None,
+    )
+
+
+def compare(results: list[dict], baseline_path: str, threshold: float) -> list[str]:
+    """Returns descriptions of benchmarks whose mean is more than `threshold` times slower than the baseline."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {r["name"]: r for r in json.load(f)["results"]}
+    regressions = []
+    for r in results:
+        base = baseline.get(r["name"])
+        if base and r["mean"] > base["mean"] * threshold:
+            regressions.append(f"{r['name']}: {r['mean'] * 1000:.2f}ms vs {base['mean'] * 1000:.2f}ms in baseline")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="file to write results to as JSON, defaults to stdout")
+    parser.add_argument("--latency", type=float, default=20, help="latency of the stub API server in ms")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier for the number of iterations")
+    parser.add_argument("--only", nargs="+", help="names of benchmarks to run")
+    parser.add_argument("--compare", help="results of a previous run to check for regressions against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="slowdown relative to --compare that fails")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.latency / 1000, args.scale, set(args.only) if args.only else None)
+    try:
+        plugin_version = version("beets-audible")
+    except PackageNotFoundError:
+        plugin_version = None
+    output = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "beets": version("beets"),
+        "beets_audible": plugin_version,
+        "latency_ms": args.latency,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2)
+    else:
+        print(json.dumps(output, indent=2))
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        for r in regressions:
+            print(f"Regression: {r}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""
+Measures import throughput by running `beet import` with the plugin on a synthetic library generated by
+`benchmarks.synthetic`, against a local stub of the APIs serving the books in the library, under several configurations.
+Reports books imported per minute, API requests per book and the peak memory use of each import.
+
+Usage: python -m benchmarks.scenarios LIBRARY_FOLDER [--scenarios baseline cache] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+import yaml
+
+from .stub_server import StubServer
+from .synthetic import load_manifest
+
+# Settings of the plugin for each scenario. Warm scenarios import the library once before the measured import,
+# sharing the plugin's cache but not the beets library.
+SCENARIOS = {
+    "baseline": {"config": {}},
+    "cache": {"config": {"cache": True}},
+    "cache_warm": {"config": {"cache": True}, "warm": True},
+    "adaptive_concurrency": {"config": {"adaptive_concurrency": True}},
+    "goodreads": {"config": {"goodreads_apikey": "bench"}},
+    "all": {
+        "config": {
+            "cache": True,
+            "adaptive_concurrency": True,
+            "background_sidecar_writes": True,
+        }
+    },
+}
+REPO_ROOT = Path(__file__).parent.parent
+
+
+class SyntheticStubServer(StubServer):
+    """
+    Serves the books of a synthetic library. Searches return the book whose title is in the keywords,
+    along with `distractors` other books, like real searches which return several similar books.
+    """
+
+    def __init__(self, manifest: list[dict], latency: float = 0.0, distractors: int = 4, seed: int = 0):
+        super().__init__(latency=latency, large_book_asins=())
+        self.books = {b["asin"]: b for b in manifest}
+        self.distractors = distractors
+        self.rng = random.Random(seed)
+
+    def get_search(self, keywords: str) -> dict:
+        keywords = f"{keywords.lower()} "
+        matches = [b for b in self.books.values() if f"{b['title'].lower()} " in keywords]
+        others = self.rng.sample(list(self.books.values()), min(self.distractors, len(self.books)))
+        products = [self.get_product(b) for b in matches + [b for b in others if b not in matches]]
+        return {"products": products, "response_groups": [], "total_results": len(products)}
+
+    def get_product(self, book: dict) -> dict:
+        return {
+            "asin": book["asin"],
+            "authors": [{"asin": None, "name": book["author"]}],
+            "narrators": [{"name": book["narrator"]}],
+            "publisher_name": "Synthetic Audio",
+            "release_date": f"{book['year']}-01-01",
+            "runtime_length_min": sum(c["length_ms"] for c in book["chapters"]) // 60000,
+            "series": [{"asin": None, "sequence": s["position"], "title": s["name"]} for s in [book["series"]] if s],
+            "subtitle": None,
+            "title": book["title"],
+            "language": "english",
+            "format_type": "unabridged",
+        }
+
+    def get_book(self, asin: str) -> dict:
+        book = self.books[asin]
+        series = book["series"]
+        return {
+            "asin": asin,
+            "authors": [{"asin": None, "name": book["author"]}],
+            "description": f"Synthetic audiobook {asin}",
+            "formatType": "unabridged",
+            "genres": [{"asin": "1", "name": book["genre"], "type": "genre"}],
+            "image": f"{self.base_url}/images/{asin}.jpg",
+            "language": "english",
+            "narrators": [{"name": book["narrator"]}],
+            "publisherName": "Synthetic Audio",
+            "region": "us",
+            "releaseDate": f"{book['year']}-01-01T00:00:00.000Z",
+            "runtimeLengthMin": sum(c["length_ms"] for c in book["chapters"]) // 60000,
+            "seriesPrimary": {"asin": None, "name": series["name"], "position": series["position"]} if series else None,
+            "subtitle": None,
+            "summary": f"<p>Synthetic audiobook {asin}</p>",
+            "title": book["title"],
+        }
+
+    def get_chapters(self, asin: str) -> dict:
+        chapters = []
+        offset = 0
+        for c in self.books[asin]["chapters"]:
+            chapters.append(
+                {
+                    "lengthMs": c["length_ms"],
+                    "startOffsetMs": offset,
+                    "startOffsetSec": offset // 1000,
+                    "title": c["title"],
+                }
+            )
+            offset += c["length_ms"]
+        return {
+            "asin": asin,
+            "brandIntroDurationMs": 2000,
+            "brandOutroDurationMs": 5000,
+            "chapters": chapters,
+            "isAccurate": True,
+            "region": "us",
+            "runtimeLengthMs": offset,
+            "runtimeLengthSec": offset // 1000,
+        }
+
+
+def write_config(beets_dir: str, library_name: str, plugin_config: dict) -> None:
+    config = {
+        "directory": os.path.join(beets_dir, library_name),
+        "library": os.path.join(beets_dir, f"{library_name}.db"),
+        "plugins": ["audible"],
+        "import": {"copy": True, "write": True, "quiet": True, "quiet_fallback": "asis"},
+        "audible": plugin_config,
+    }
+    with open(os.path.join(beets_dir, "config.yaml"), "w", encoding="utf-8") as f:
+        yaml.safe_dump(config, f)
+
+
+def run_import(beets_dir: str, library_folder: str, stub_url: str) -> dict:
+    """Imports the library with `beet import` in a new process, returning how long it took and its peak memory use."""
+    stats_path = os.path.join(beets_dir, "worker_stats.json")
+    command = [sys.executable, "-m", "benchmarks.scenarios", "--worker", stub_url, stats_path, "import", library_folder]
+    env = {**os.environ, "BEETSDIR": beets_dir}
+    start = perf_counter()
+    subprocess.run(command, cwd=REPO_ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+    elapsed = perf_counter() - start
+    with open(stats_path, encoding="utf-8") as f:
+        return {"seconds": elapsed, **json.load(f)}
+
+
+def run_scenario(name: str, scenario: dict, library_folder: str, server: SyntheticStubServer) -> dict:
+    from beets.library import Library
+
+    with tempfile.TemporaryDirectory(prefix=f"beets-audible-{name}-") as beets_dir:
+        if scenario.get("warm"):
+            write_config(beets_dir, "warmup", scenario["config"])
+            run_import(beets_dir, library_folder, server.base_url)
+        write_config(beets_dir, "library", scenario["config"])
+        requests_before = server.request_count
+        result = run_import(beets_dir, library_folder, server.base_url)
+        requests = server.request_count - requests_before
+        lib = Library(os.path.join(beets_dir, "library.db"))
+        albums = list(lib.albums())
+        matched = sum(1 for a in albums if a.get("data_source") in ("Audible", "YAML"))
+        lib._close()
+
+    books = len(albums)
+    return {
+        "name": name,
+        "config": scenario["config"],
+        "warm": bool(scenario.get("warm")),
+        "books": books,
+        "matched": matched,
+        "seconds": result["seconds"],
+        "books_per_minute": books / result["seconds"] * 60,
+        "requests": requests,
+        "requests_per_book": requests / books if books else 0.0,
+        "peak_rss_mb": result["peak_rss_mb"],
+    }
+
+
+def run_worker(stub_url: str, stats_path: str, beet_args: list[str]) -> None:
+    """Runs beets with the plugin pointed at the stub server, then saves the process' peak memory use."""
+    from beets import ui
+
+    from .stub_server import patch_endpoints
+
+    patch_endpoints(stub_url)
+    try:
+        ui.main(beet_args)
+    finally:
+        # ru_maxrss is in KB on Linux and in bytes on macOS. Processes resizing cover art count as well.
+        unit = 1 if platform.system() == "Darwin" else 1024
+        peak = max(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        )
+        with open(stats_path, "w", encoding="utf-8") as f:
+            json.dump({"peak_rss_mb": peak * unit / 2**20}, f)
+
+
+def main() -> int:
+    if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+        run_worker(sys.argv[2], sys.argv[3], sys.argv[4:])
+        return 0
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("library", help="folder generated by benchmarks.synthetic")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS), help="scenarios to run")
+    parser.add_argument("--latency", type=float, default=20, help="latency of the stub API server in ms")
+    parser.add_argument("--distractors", type=int, default=4, help="books besides the right one in search results")
+    parser.add_argument("--output", help="file to write results to as JSON, defaults to stdout")
+    args = parser.parse_args()
+
+    library_folder = os.path.abspath(args.library)
+    server = SyntheticStubServer(load_manifest(library_folder), args.latency / 1000, args.distractors)
+    server.start()
+    results = []
+    try:
+        for name in args.scenarios:
+            result = run_scenario(name, SCENARIOS[name], library_folder, server)
+            print(
+                f"{name}: {result['books']} books ({result['matched']} matched) in {result['seconds']:.1f}s,"
+                f" {result['books_per_minute']:.1f} books/min, {result['requests_per_book']:.1f} requests/book,"
+                f" peak RSS {result['peak_rss_mb']:.0f} MB",
+                file=sys.stderr,
+            )
+            results.append(result)
+    finally:
+        server.stop()
+
+    output = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "latency_ms": args.latency,
+        "distractors": args.distractors,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2)
+    else:
+        print(json.dumps(output, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""A local stand-in for the Audible, Audnex and Goodreads APIs, serving the recorded fixtures in this folder."""
+
+import copy
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib import parse
+
+from beetsplug import api
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def load_fixture(name: str):
+    path = FIXTURES / name
+    return json.loads(path.read_text()) if path.suffix == ".json" else path.read_bytes()
+
+
+def patch_endpoints(base_url: str) -> None:
+    """Points the plugin's API functions at a stub server, e.g one started by another process."""
+    for region in api.AUDIBLE_ENDPOINTS:
+        api.AUDIBLE_ENDPOINTS[region] = f"{base_url}/1.0/catalog/products"
+    api.AUDNEX_ENDPOINT = base_url
+    api.GOODREADS_ENDPOINT = f"{base_url}/search/index.xml"
+
+
+class StubServer:
+    """
+    Serves the fixtures on localhost, sleeping for `latency` seconds before each response.
+    Books whose asin is in `large_book_asins` are served with 300+ chapters.
+    """
+
+    def __init__(self, latency: float = 0.0, large_book_asins=("B0BENCH000",)):
+        self.latency = latency
+        self.large_book_asins = set(large_book_asins)
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self.search = load_fixture("audible_search.json")
+        self.book = load_fixture("audnex_book.json")
+        self.chapters = load_fixture("audnex_chapters.json")
+        self.large_chapters = load_fixture("audnex_chapters_large.json")
+        self.goodreads = load_fixture("goodreads_search.xml")
+        self.products = {p["asin"]: p for p in self.search["products"]}
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.make_handler())
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def start(self) -> None:
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def patch_endpoints(self) -> None:
+        """Points the plugin's API functions at this server."""
+        patch_endpoints(self.base_url)
+
+    def get_search(self, keywords: str) -> dict:
+        return self.search
+
+    def get_book(self, asin: str) -> dict:
+        book = copy.deepcopy(self.book)
+        book["asin"] = asin
+        if asin in self.products:
+            book["title"] = self.products[asin]["title"]
+            book["subtitle"] = self.products[asin]["subtitle"]
+        book["image"] = f"{self.base_url}/images/{asin}.jpg"
+        return book
+
+    def get_chapters(self, asin: str) -> dict:
+        chapters = copy.deepcopy(self.large_chapters if asin in self.large_book_asins else self.chapters)
+        chapters["asin"] = asin
+        return chapters
+
+    def make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub._lock:
+                    stub.request_count += 1
+                time.sleep(stub.latency)
+                url = parse.urlsplit(self.path)
+                path = url.path
+                if path == "/1.0/catalog/products":
+                    keywords = parse.parse_qs(url.query).get("keywords", [""])[0]
+                    self.respond(json.dumps(stub.get_search(keywords)).encode(), "application/json")
+                elif m := re.fullmatch(r"/books/(\w+)/chapters", path):
+                    self.respond(json.dumps(stub.get_chapters(m[1])).encode(), "application/json")
+                elif m := re.fullmatch(r"/books/(\w+)", path):
+                    self.respond(json.dumps(stub.get_book(m[1])).encode(), "application/json")
+                elif path == "/search/index.xml":
+                    self.respond(stub.goodreads, "application/xml")
+                elif path.startswith("/images/"):
+                    # Not a real image, but nothing in the plugin decodes it
+                    self.respond(b"\xff\xd8\xff\xe0" + bytes(4096), "image/jpeg")
+                else:
+                    self.send_error(404)
+
+            def respond(self, body: bytes, content_type: str) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
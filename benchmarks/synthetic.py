@@ -0,0 +1,242 @@
+"""
+Generates a library of synthetic audiobooks, made of tiny but valid MP3 and M4B files with realistic tags and durations,
+along with a manifest describing each book, which the stub API server used by `benchmarks.scenarios` serves.
+
+Usage: python -m benchmarks.synthetic OUTPUT_FOLDER [--books 100] [--seed 0]
+"""
+
+import argparse
+import json
+import os
+import random
+import struct
+import sys
+
+import yaml
+from mediafile import MediaFile
+
+MANIFEST_NAME = "manifest.json"
+# A silent MPEG-1 Layer III frame: 128 kbps, 44.1 kHz, joint stereo, 417 bytes long and 1152 samples
+MP3_FRAME = bytes.fromhex("FFFB9064") + bytes(413)
+MP3_FRAME_SECONDS = 1152 / 44100
+# The Xing header goes after the frame header and 32 bytes of side information
+XING_OFFSET = 36
+MP3_FRAME_COUNT = 8
+
+FIRST_NAMES = ["Ada", "Brandon", "Clara", "Dmitri", "Elena", "Farid", "Grace", "Hiro", "Ines", "Jonas", "Kiri", "Liam"]
+LAST_NAMES = ["Abbott", "Brightwater", "Castellan", "Drummond", "Everly", "Fairweather", "Grayson", "Holloway"]
+TITLE_WORDS = [
+    "Shadow", "Crown", "River", "Ember", "Winter", "Glass", "Iron", "Silent", "Forgotten", "Storm", "Garden", "Star",
+    "Empire", "Hollow", "Lantern", "Tide", "Ash", "Oath", "Raven", "Harbor", "Wolf", "Thorn", "Echo", "Citadel",
+]  # fmt: skip
+GENRES = ["Fantasy", "Science Fiction", "Mystery", "Thriller", "History", "Biography", "Romance", "Horror"]
+
+
+def mp3_bytes(seconds: float) -> bytes:
+    """
+    Returns a few silent MP3 frames, whose Xing header claims enough frames for the given duration,
+    so that tag readers report the duration of a full chapter for a file of a few KB.
+    """
+    frame_count = max(MP3_FRAME_COUNT, round(seconds / MP3_FRAME_SECONDS))
+    xing = b"Xing" + struct.pack(">II", 1, frame_count)
+    first_frame = MP3_FRAME[:XING_OFFSET] + xing + MP3_FRAME[XING_OFFSET + len(xing) :]
+    return first_frame + MP3_FRAME * (MP3_FRAME_COUNT - 1)
+
+
+def box(kind: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I", 8 + len(payload)) + kind + payload
+
+
+def full_box(kind: bytes, payload: bytes, version: int = 0, flags: int = 0) -> bytes:
+    return box(kind, struct.pack(">I", (version << 24) | flags) + payload)
+
+
+def m4b_bytes(seconds: float) -> bytes:
+    """Returns an MP4 audio file without any samples, whose headers claim the given duration."""
+    timescale = 1000
+    duration = round(seconds * timescale)
+    matrix = struct.pack(">9I", 0x10000, 0, 0, 0, 0x10000, 0, 0, 0, 0x40000000)
+    mvhd = full_box(
+        b"mvhd", struct.pack(">IIIIIH10x", 0, 0, timescale, duration, 0x10000, 0x100) + matrix + bytes(24) + b"\0\0\0\2"
+    )
+    tkhd = full_box(
+        b"tkhd", struct.pack(">IIII4xI8xHHH2x", 0, 0, 1, 0, duration, 0, 0, 0x100) + matrix + bytes(8), flags=3
+    )
+    mdhd = full_box(b"mdhd", struct.pack(">IIIIHH", 0, 0, timescale, duration, 0x55C4, 0))
+    hdlr = full_box(b"hdlr", struct.pack(">I4s12x", 0, b"soun") + b"SoundHandler\0")
+    # AAC-LC, 44.1 kHz stereo, 64 kbps
+    decoder_config = bytes([0x04, 17, 0x40, 0x15]) + struct.pack(">3xII", 64000, 64000) + bytes([0x05, 2, 0x12, 0x10])
+    es_descriptor = bytes([0x03, 3 + len(decoder_config) + 3]) + struct.pack(">HB", 1, 0) + decoder_config
+    esds = full_box(b"esds", es_descriptor + bytes([0x06, 1, 0x02]))
+    mp4a = box(b"mp4a", bytes(6) + struct.pack(">H8xHHHHI", 1, 2, 16, 0, 0, 44100 << 16) + esds)
+    stbl = box(
+        b"stbl",
+        full_box(b"stsd", struct.pack(">I", 1) + mp4a)
+        + full_box(b"stts", struct.pack(">I", 0))
+        + full_box(b"stsc", struct.pack(">I", 0))
+        + full_box(b"stsz", struct.pack(">II", 0, 0))
+        + full_box(b"stco", struct.pack(">I", 0)),
+    )
+    dinf = box(b"dinf", full_box(b"dref", struct.pack(">I", 1) + full_box(b"url ", b"", flags=1)))
+    minf = box(b"minf", full_box(b"smhd", bytes(4)) + dinf + stbl)
+    trak = box(b"trak", tkhd + box(b"mdia", mdhd + hdlr + minf))
+    ftyp = box(b"ftyp", b"M4B " + struct.pack(">I", 0) + b"M4B mp42isom")
+    return ftyp + box(b"moov", mvhd + trak) + box(b"mdat", b"")
+
+
+def make_book(rng: random.Random, index: int, max_chapters: int) -> dict:
+    """Returns a random book, as described in the manifest."""
+    author = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    title = " ".join(["The", *rng.sample(TITLE_WORDS, rng.randint(1, 3))]) + f" {index}"
+    series = None
+    if rng.random() < 0.4:
+        series = {"name": f"The {rng.choice(TITLE_WORDS)} Saga", "position": str(rng.randint(1, 12))}
+    # Most books have a few dozen chapters, some have hundreds
+    chapter_count = min(max_chapters, max(1, int(rng.lognormvariate(3.2, 0.8))))
+    chapters = [
+        {"title": f"Chapter {i + 1}", "length_ms": rng.randint(5, 40) * 60000 + rng.randint(0, 59999)}
+        for i in range(chapter_count)
+    ]
+    return {
+        "asin": f"B0SYN{index:05d}",
+        "title": title,
+        "author": author,
+        "narrator": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "series": series,
+        "genre": rng.choice(GENRES),
+        "year": rng.randint(1990, 2024),
+        "chapters": chapters,
+    }
+
+
+def write_book(root: str, book: dict, rng: random.Random, m4b_ratio: float, multi_disc_ratio: float) -> None:
+    """Writes the files of a book, recording its layout in the book's manifest entry."""
+    folder = os.path.join(root, book["author"], book["title"])
+    chapters = book["chapters"]
+    if rng.random() < m4b_ratio:
+        book["format"] = "m4b"
+        # M4B books are usually a single file, but some are split by chapter
+        is_single_file = rng.random() < 0.5
+        files = [(folder, 1, 1, [chapters] if is_single_file else [[c] for c in chapters])]
+    else:
+        book["format"] = "mp3"
+        disc_count = rng.randint(2, 4) if len(chapters) >= 8 and rng.random() < multi_disc_ratio else 1
+        per_disc = -(-len(chapters) // disc_count)
+        discs = [chapters[i : i + per_disc] for i in range(0, len(chapters), per_disc)]
+        if len(discs) == 1:
+            files = [(folder, 1, 1, [[c] for c in chapters])]
+        else:
+            files = [
+                (os.path.join(folder, f"Disc {d + 1}"), d + 1, len(discs), [[c] for c in disc])
+                for d, disc in enumerate(discs)
+            ]
+    book["path"] = os.path.relpath(folder, root)
+    book["discs"] = len(files)
+    book["files"] = sum(len(f[3]) for f in files)
+
+    for disc_folder, disc, disc_total, file_chapters in files:
+        os.makedirs(disc_folder, exist_ok=True)
+        for track, file_chapter in enumerate(file_chapters, start=1):
+            seconds = sum(c["length_ms"] for c in file_chapter) / 1000
+            name = f"{track:03d} - {file_chapter[0]['title']}" if len(file_chapters) > 1 else book["title"]
+            path = os.path.join(disc_folder, f"{name}.{book['format']}")
+            with open(path, "wb") as f:
+                f.write(m4b_bytes(seconds) if book["format"] == "m4b" else mp3_bytes(seconds))
+            tag_file(path, book, file_chapter[0]["title"], track, len(file_chapters), disc, disc_total)
+
+
+def tag_file(path: str, book: dict, title: str, track: int, track_total: int, disc: int, disc_total: int) -> None:
+    f = MediaFile(path)
+    f.title = title if track_total > 1 else book["title"]
+    f.album = book["title"]
+    f.artist = book["author"]
+    f.albumartist = book["author"]
+    f.composer = book["narrator"]
+    f.genre = book["genre"]
+    f.year = book["year"]
+    f.track = track
+    f.tracktotal = track_total
+    f.disc = disc
+    f.disctotal = disc_total
+    f.comments = f"Synthetic audiobook {book['asin']}"
+    f.save()
+
+
+def write_metadata_file(root: str, book: dict) -> None:
+    data = {
+        "title": book["title"],
+        "authors": [book["author"]],
+        "narrators": [book["narrator"]],
+        "description": f"Synthetic audiobook {book['asin']}",
+        "genres": [book["genre"]],
+        "releaseDate": f"{book['year']}-01-01",
+        "publisher": "Synthetic Audio",
+    }
+    if book["series"]:
+        data["series"] = book["series"]["name"]
+        data["seriesPosition"] = book["series"]["position"]
+    with open(os.path.join(root, book["path"], "metadata.yml"), "w", encoding="utf-8") as f:
+        # Dates are written unquoted, so that they're loaded as dates like in hand written files
+        f.write(yaml.safe_dump(data, sort_keys=False).replace(f"'{book['year']}-01-01'", f"{book['year']}-01-01"))
+
+
+def generate(
+    root: str,
+    books: int,
+    seed: int = 0,
+    max_chapters: int = 300,
+    m4b_ratio: float = 0.3,
+    multi_disc_ratio: float = 0.1,
+    metadata_ratio: float = 0.05,
+) -> list[dict]:
+    """Generates a synthetic library in `root`, returning and saving its manifest."""
+    rng = random.Random(seed)
+    manifest = []
+    for i in range(books):
+        book = make_book(rng, i, max_chapters)
+        write_book(root, book, rng, m4b_ratio, multi_disc_ratio)
+        book["metadata_file"] = rng.random() < metadata_ratio
+        if book["metadata_file"]:
+            write_metadata_file(root, book)
+        manifest.append(book)
+    with open(os.path.join(root, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+def load_manifest(root: str) -> list[dict]:
+    with open(os.path.join(root, MANIFEST_NAME), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output", help="folder to create the library in")
+    parser.add_argument("--books", type=int, default=100, help="number of books to generate")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the random choices, for reproducible libraries")
+    parser.add_argument("--max-chapters", type=int, default=300, help="maximum number of chapters per book")
+    parser.add_argument("--m4b-ratio", type=float, default=0.3, help="fraction of books made of M4B files")
+    parser.add_argument("--multi-disc-ratio", type=float, default=0.1, help="fraction of MP3 books split in discs")
+    parser.add_argument("--metadata-ratio", type=float, default=0.05, help="fraction of books with a metadata.yml")
+    args = parser.parse_args()
+
+    if os.path.exists(args.output) and os.listdir(args.output):
+        print(f"{args.output} is not empty", file=sys.stderr)
+        return 1
+    os.makedirs(args.output, exist_ok=True)
+    manifest = generate(
+        args.output,
+        args.books,
+        seed=args.seed,
+        max_chapters=args.max_chapters,
+        m4b_ratio=args.m4b_ratio,
+        multi_disc_ratio=args.multi_disc_ratio,
+        metadata_ratio=args.metadata_ratio,
+    )
+    files = sum(b["files"] for b in manifest)
+    print(f"Generated {len(manifest)} books with {files} files in {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
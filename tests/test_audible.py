@@ -0,0 +1,249 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from beets import ui
+from beets.autotag.hooks import AlbumInfo
+from beets.library import Item
+
+import beetsplug.audible
+from beetsplug.audible import Audible, get_task_key, write_file_if_changed
+from beetsplug.cache import MetadataCache
+
+ITEMS = [Item(path=b"/audiobooks/Wizard's First Rule/01.mp3")]
+TASK_KEY = get_task_key(ITEMS)
+
+
+@pytest.fixture(scope="module")
+def audible():
+    # The plugin adds fields to MediaFile, so it can only be created once
+    return Audible()
+
+
+@pytest.fixture
+def plugin(audible, monkeypatch):
+    monkeypatch.setattr(audible, "candidate_memo", {})
+    return audible
+
+
+class FakeSearch:
+    """Stands in for `Audible.find_albums`, recording its calls."""
+
+    def __init__(self, results=None):
+        self.results = results if results is not None else [AlbumInfo(tracks=[], album="Wizard's First Rule")]
+        self.calls = []
+
+    def __call__(self, query, album, artist, region):
+        self.calls.append(region)
+        if isinstance(self.results, Exception):
+            raise self.results
+        return self.results
+
+
+def lookup(plugin, region, speculative=False):
+    return plugin.get_memoized_albums(
+        TASK_KEY, "wizards first rule", "Wizard's First Rule", "Terry Goodkind", region, speculative
+    )
+
+
+def test_switching_back_to_a_region_reuses_its_books(plugin, monkeypatch):
+    search = FakeSearch()
+    monkeypatch.setattr(plugin, "find_albums", search)
+
+    first = lookup(plugin, "us")
+    lookup(plugin, "uk")
+    again = lookup(plugin, "us")
+
+    assert search.calls == ["us", "uk"]
+    assert again == first
+    # Each caller gets copies, since beets modifies candidates
+    assert again[0] is not first[0]
+
+
+@pytest.mark.parametrize("results", [[], OSError("connection reset")])
+def test_failed_lookups_are_retried(plugin, monkeypatch, results):
+    search = FakeSearch(results)
+    monkeypatch.setattr(plugin, "find_albums", search)
+
+    for _ in range(2):
+        if isinstance(results, Exception):
+            with pytest.raises(OSError, match="connection reset"):
+                lookup(plugin, "us")
+        else:
+            assert lookup(plugin, "us") == []
+
+    assert search.calls == ["us", "us"]
+
+
+def test_speculative_lookups_are_skipped_once_a_candidate_is_chosen(plugin, monkeypatch):
+    search = FakeSearch()
+    monkeypatch.setattr(plugin, "find_albums", search)
+    lookup(plugin, "us")
+
+    plugin.on_import_task_choice(None, SimpleNamespace(is_album=True, items=ITEMS, match=None))
+
+    assert lookup(plugin, "uk", speculative=True) == []
+    assert search.calls == ["us"]
+    assert plugin.candidate_memo == {}
+
+
+def test_other_regions_are_looked_up_while_choosing(plugin, monkeypatch):
+    search = FakeSearch()
+    monkeypatch.setattr(plugin, "find_albums", search)
+    monkeypatch.setattr(plugin, "region_switch_prefetch", ["us", "uk"])
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(plugin, "region_switch_executor", executor)
+    lookup(plugin, "us")
+
+    plugin.prefetch_other_regions(SimpleNamespace(is_album=True, items=ITEMS))
+    executor.shutdown(wait=True)
+    lookup(plugin, "uk")
+
+    assert search.calls == ["us", "uk"]
+
+
+def test_lookups_wait_for_a_lookup_in_progress(plugin, monkeypatch):
+    started, finish = threading.Event(), threading.Event()
+    search = FakeSearch()
+    monkeypatch.setattr(plugin, "find_albums", search)
+    lookup(plugin, "us")
+
+    def slow_search(*args):
+        started.set()
+        finish.wait(timeout=5)
+        return search(*args)
+
+    monkeypatch.setattr(plugin, "find_albums", slow_search)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        # The user switches to a region which is being looked up in the background
+        owner = executor.submit(lookup, plugin, "uk", True)
+        assert started.wait(timeout=5)
+        waiter = executor.submit(lookup, plugin, "uk")
+        assert not waiter.done()
+        finish.set()
+
+        assert waiter.result(timeout=5) == owner.result(timeout=5)
+    assert search.calls == ["us", "uk"]
+
+
+def test_unchanged_files_are_not_written(tmp_path):
+    path = tmp_path / "desc.txt"
+    path.write_text("A book about wizards")
+    os.utime(path, ns=(0, 0))
+
+    assert not write_file_if_changed(bytes(path), "A book about wizards")
+    assert path.stat().st_mtime_ns == 0
+
+
+def test_files_are_replaced_atomically(tmp_path):
+    path = tmp_path / "desc.txt"
+    path.write_text("A book about wizards")
+    inode = path.stat().st_ino
+
+    assert write_file_if_changed(bytes(path), "A book about Richard and Kahlan")
+    assert path.read_text() == "A book about Richard and Kahlan"
+    # The file is replaced by another, so readers never see it partially written
+    assert path.stat().st_ino != inode
+    assert os.listdir(tmp_path) == ["desc.txt"]
+
+
+def test_temporary_file_is_removed_if_replacing_fails(tmp_path, monkeypatch):
+    path = tmp_path / "desc.txt"
+    path.write_text("A book about wizards")
+
+    def fail(src, dst):
+        raise PermissionError("denied")
+
+    monkeypatch.setattr(os, "replace", fail)
+    with pytest.raises(PermissionError, match="denied"):
+        write_file_if_changed(bytes(path), "A book about Richard and Kahlan")
+
+    assert path.read_text() == "A book about wizards"
+    assert os.listdir(tmp_path) == ["desc.txt"]
+
+
+def test_export_errors_are_reported(plugin, monkeypatch, tmp_path):
+    cache = MetadataCache(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(plugin, "cache", cache)
+    export_command = next(c for c in plugin.commands() if c.name == "audible-export-cache")
+
+    try:
+        with pytest.raises(ui.UserError, match="Could not export to"):
+            export_command.func(None, None, [str(tmp_path / "missing" / "bundle.jsonl.gz")])
+    finally:
+        cache.close()
+
+
+class FakeAlbum:
+    def __init__(self):
+        self.art = None
+
+    def set_art(self, path, copy):
+        with open(path, "rb") as f:
+            self.art = f.read()
+
+    def store(self):
+        pass
+
+
+class FakeTask:
+    def __init__(self):
+        self.album = FakeAlbum()
+
+    def imported_items(self):
+        return []
+
+
+def download_art(tmp_path, name):
+    path = tmp_path / name
+    path.write_bytes(b"cover")
+    return bytes(path)
+
+
+@pytest.fixture
+def art_plugin(plugin, monkeypatch):
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(plugin, "art_executor", executor)
+    monkeypatch.setattr(plugin, "processed_art", {})
+    monkeypatch.setattr(plugin, "cover_art", {})
+    yield plugin
+    executor.shutdown()
+
+
+def test_art_files_are_removed_once_no_task_needs_them(art_plugin, monkeypatch, tmp_path):
+    def resize(path, maxwidth, quality):
+        resized = path + b".resized"
+        with open(resized, "wb") as f:
+            f.write(b"small cover")
+        return resized
+
+    monkeypatch.setattr(beetsplug.audible, "normalize_art", resize)
+    tasks = [FakeTask(), FakeTask()]
+    for i, task in enumerate(tasks):
+        cover_path = download_art(tmp_path, f"cover{i}.jpg")
+        art_plugin.cover_art[task] = (cover_path, art_plugin.process_art(cover_path))
+
+    # Both tasks have the same image, so they share the resized one
+    art_plugin.on_import_task_files(tasks[0], None)
+    assert sorted(os.listdir(tmp_path)) == ["cover0.jpg.resized", "cover1.jpg"]
+    art_plugin.on_import_task_files(tasks[1], None)
+
+    assert [t.album.art for t in tasks] == [b"small cover", b"small cover"]
+    assert os.listdir(tmp_path) == []
+    assert art_plugin.processed_art == {}
+
+
+def test_tasks_use_their_own_art_if_resizing_fails(art_plugin, monkeypatch, tmp_path):
+    monkeypatch.setattr(beetsplug.audible, "normalize_art", lambda path, maxwidth, quality: path)
+    tasks = [FakeTask(), FakeTask()]
+    for i, task in enumerate(tasks):
+        cover_path = download_art(tmp_path, f"cover{i}.jpg")
+        art_plugin.cover_art[task] = (cover_path, art_plugin.process_art(cover_path))
+
+    for task in tasks:
+        art_plugin.on_import_task_files(task, None)
+
+    assert [t.album.art for t in tasks] == [b"cover", b"cover"]
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,129 @@
+import gzip
+
+import pytest
+
+from beetsplug.cache import MetadataCache
+
+
+def make_product(asin, title, author="Terry Goodkind", release_date="2020-01-01", series=None):
+    return {
+        "asin": asin,
+        "title": title,
+        "subtitle": None,
+        "authors": [{"name": author}],
+        "narrators": [{"name": "Sam Tsoutsouvas"}],
+        "series": [{"title": series}] if series else [],
+        "release_date": release_date,
+    }
+
+
+def make_book(asin, title, release_date="2020-01-01T00:00:00.000Z"):
+    return {
+        "asin": asin,
+        "title": title,
+        "authors": [{"name": "Terry Goodkind"}],
+        "narrators": [{"name": "Sam Tsoutsouvas"}],
+        "seriesPrimary": {"name": "Sword of Truth", "position": "1"},
+        "releaseDate": release_date,
+    }
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = MetadataCache(str(tmp_path / "cache.db"))
+    yield cache
+    cache.close()
+
+
+def test_search_matches_all_words_ignoring_punctuation(cache):
+    cache.index_products(
+        [make_product("B1", "Wizard's First Rule"), make_product("B2", "Stone of Tears")],
+        "us",
+    )
+
+    assert [r["asin"] for r in cache.search("wizards first rule", "us")] == ["B1"]
+    assert cache.search("wizard's rule", "us")[0]["title"] == "Wizards First Rule"
+    assert cache.search("first tears", "us") == []
+
+
+def test_search_is_limited_to_the_region(cache):
+    cache.index_products([make_product("B1", "Wizard's First Rule")], "uk")
+
+    assert cache.search("wizards first rule", "us") == []
+    assert [r["asin"] for r in cache.search("wizards first rule", "uk")] == ["B1"]
+
+
+def test_search_ignores_fts_syntax_in_queries(cache):
+    cache.index_products([make_product("B1", "Wizard's First Rule")], "us")
+
+    assert cache.search('wizard* OR "rule', "us") == []
+    assert cache.search("!!!", "us") == []
+
+
+def test_reindexing_a_product_replaces_its_row(cache):
+    cache.index_products([make_product("B1", "Wizard's First Rule")], "us")
+    cache.put_book("B1", "us", make_book("B1", "Wizard's First Rule (Unabridged)"), {"chapters": []})
+
+    results = cache.search("wizards first rule", "us")
+    assert len(results) == 1
+    assert results[0]["title"] == "Wizards First Rule Unabridged"
+    assert results[0]["release_date"] == "2020-01-01"
+
+
+def test_search_returns_release_dates(cache):
+    cache.index_products([make_product("B1", "Wizard's First Rule", release_date="2099-01-01")], "us")
+
+    assert cache.search("wizards first rule", "us")[0]["release_date"] == "2099-01-01"
+
+
+def test_books_and_searches_round_trip(cache):
+    book, chapters = make_book("B1", "Wizard's First Rule"), {"chapters": [{"title": "Chapter 1"}]}
+    response = {"products": [make_product("B2", "Stone of Tears")]}
+    cache.put_book("B1", "us", book, chapters)
+    cache.put_search("stone of tears", "us", response)
+
+    assert cache.get_book("B1", "us") == (book, chapters)
+    assert cache.get_book("B1", "uk") is None
+    assert cache.get_search("stone of tears", "us") == response
+    assert [r["asin"] for r in cache.search("stone of tears", "us")] == ["B2"]
+
+
+def test_seeded_books_can_be_excluded(cache):
+    book, chapters = make_book("B1", "Wizard's First Rule"), {"chapters": []}
+    assert cache.seed_books([("B1", "us", book, chapters)]) == 1
+    assert cache.seed_books([("B1", "us", book, chapters)]) == 0
+
+    assert cache.get_book("B1", "us") == (book, chapters)
+    assert cache.get_book("B1", "us", include_seeded=False) is None
+
+
+def test_bundle_round_trip(cache, tmp_path):
+    book, chapters = make_book("B1", "Wizard's First Rule"), {"chapters": [{"title": "Chapter 1"}]}
+    cache.put_book("B1", "us", book, chapters)
+    cache.seed_books([("B3", "us", make_book("B3", "Blood of the Fold"), {"chapters": []})])
+    cache.put_search("stone of tears", "us", {"products": [make_product("B2", "Stone of Tears")]})
+    cache.put_art("https://example.com/cover.jpg", b"\xff\xd8\xff\xe0")
+    bundle_path = str(tmp_path / "bundle.jsonl.gz")
+
+    assert cache.export_bundle(bundle_path) == {"books": 2, "searches": 1, "art": 1}
+
+    other = MetadataCache(str(tmp_path / "other.db"))
+    try:
+        assert other.import_bundle(bundle_path) == {"books": 2, "searches": 1, "art": 1}
+        assert other.get_book("B1", "us") == (book, chapters)
+        assert other.get_book("B3", "us", include_seeded=False) is None
+        assert other.get_search("stone of tears", "us") == cache.get_search("stone of tears", "us")
+        assert other.get_art("https://example.com/cover.jpg") == b"\xff\xd8\xff\xe0"
+        assert [r["asin"] for r in other.search("wizards first rule", "us")] == ["B1"]
+        assert [r["asin"] for r in other.search("stone of tears", "us")] == ["B2"]
+    finally:
+        other.close()
+
+
+def test_import_bundle_rejects_other_files(cache, tmp_path):
+    path = tmp_path / "not-a-bundle.gz"
+    with gzip.open(path, "wt") as f:
+        f.write('{"format": "something else"}\n')
+
+    with pytest.raises(ValueError, match="is not a cache bundle"):
+        cache.import_bundle(str(path))
@@ -0,0 +1,99 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import request
+from urllib.error import HTTPError, URLError
+
+import pytest
+
+from beetsplug.cassette import Cassette
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        if self.path.startswith("/missing"):
+            self.send_response(404)
+            self.end_headers()
+            self.wfile.write(b"not found")
+            return
+        body = b"\xff\xd8\xff" if self.path.startswith("/image") else json.dumps({"count": len(self.server.requests)})
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.end_headers()
+        self.wfile.write(body if isinstance(body, bytes) else body.encode("utf-8"))
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", server.requests
+    server.shutdown()
+    server.server_close()
+
+
+def fetch(cassette, url):
+    with cassette.open_url(request.Request(url)) as response:
+        return response.status, response.read()
+
+
+def test_replays_recorded_responses_in_order(server, tmp_path):
+    base_url, requests = server
+    recorder = Cassette()
+    recorder.enable(str(tmp_path), "record")
+    recorded = [fetch(recorder, f"{base_url}/book"), fetch(recorder, f"{base_url}/book")]
+    recorded.append(fetch(recorder, f"{base_url}/image.jpg"))
+    with pytest.raises(HTTPError):
+        fetch(recorder, f"{base_url}/missing")
+    assert len(requests) == 4
+
+    player = Cassette()
+    player.enable(str(tmp_path), "replay")
+    replayed = [fetch(player, f"{base_url}/book"), fetch(player, f"{base_url}/book")]
+    replayed.append(fetch(player, f"{base_url}/image.jpg"))
+    with pytest.raises(HTTPError) as e:
+        fetch(player, f"{base_url}/missing")
+
+    assert replayed == recorded
+    assert json.loads(replayed[1][1]) == {"count": 2}
+    assert replayed[2][1] == b"\xff\xd8\xff"
+    assert e.value.code == 404
+    assert e.value.read() == b"not found"
+    # Once recordings run out, the last one is repeated
+    assert fetch(player, f"{base_url}/book") == recorded[1]
+    assert len(requests) == 4
+
+
+def test_unrecorded_requests_fail_when_replaying(tmp_path):
+    player = Cassette()
+    player.enable(str(tmp_path), "replay")
+
+    with pytest.raises(URLError):
+        fetch(player, "http://127.0.0.1:1/book")
+
+
+def test_secrets_are_not_recorded(server, tmp_path):
+    base_url, _ = server
+    recorder = Cassette()
+    recorder.enable(str(tmp_path), "record")
+    fetch(recorder, f"{base_url}/book?id=1&key=secret")
+
+    recordings = [p.read_text() for p in tmp_path.rglob("*.json")]
+    assert len(recordings) == 1
+    assert "secret" not in recordings[0]
+
+    # Requests are matched without their secrets, so recordings can be replayed with another key
+    player = Cassette()
+    player.enable(str(tmp_path), "replay")
+    assert fetch(player, f"{base_url}/book?id=1&key=other")[0] == 200
+
+
+def test_invalid_mode_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="invalid cassette mode"):
+        Cassette().enable(str(tmp_path), "rewind")
@@ -0,0 +1,100 @@
+from urllib.error import HTTPError, URLError
+
+import pytest
+
+from beetsplug.concurrency import INITIAL_LIMIT, MIN_LIMIT, AdaptiveConcurrency, HostLimiter
+
+
+def make_requests(limiter, count, overloaded=False):
+    """Makes `count` requests at once, finishing them in order."""
+    starts = [limiter.acquire() for _ in range(count)]
+    for start in starts:
+        limiter.release(start, overloaded)
+
+
+def test_limit_grows_additively_while_saturated():
+    limiter = HostLimiter("example.com", maximum=8)
+    assert limiter.limit == INITIAL_LIMIT
+
+    make_requests(limiter, 2)
+
+    # Only the first request to finish found the limit reached
+    assert limiter.limit == INITIAL_LIMIT + 1 / INITIAL_LIMIT
+
+
+def test_limit_does_not_grow_when_not_reached():
+    limiter = HostLimiter("example.com", maximum=8)
+
+    for _ in range(10):
+        make_requests(limiter, 1)
+
+    assert limiter.limit == INITIAL_LIMIT
+
+
+def test_limit_does_not_exceed_maximum():
+    limiter = HostLimiter("example.com", maximum=3)
+
+    for _ in range(50):
+        make_requests(limiter, int(limiter.limit))
+
+    assert limiter.limit == 3
+
+
+def test_limit_is_halved_once_per_congestion_event():
+    limiter = HostLimiter("example.com", maximum=16)
+    for _ in range(30):
+        make_requests(limiter, int(limiter.limit))
+    limit = limiter.limit
+    assert limit >= 4
+
+    # Requests which were in flight when the limit was decreased don't decrease it again
+    make_requests(limiter, int(limit), overloaded=True)
+
+    assert limiter.limit == limit / 2
+
+
+def test_limit_does_not_go_below_minimum():
+    limiter = HostLimiter("example.com", maximum=8)
+
+    for _ in range(5):
+        make_requests(limiter, 1, overloaded=True)
+
+    assert limiter.limit == MIN_LIMIT
+
+
+def test_maximum_below_initial_limit():
+    limiter = HostLimiter("example.com", maximum=1)
+
+    assert limiter.limit == 1
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        HTTPError("https://example.com", 503, "Service Unavailable", None, None),
+        URLError(ConnectionResetError(104, "Connection reset by peer")),
+        TimeoutError("timed out"),
+    ],
+)
+def test_failed_requests_decrease_limit(error):
+    concurrency = AdaptiveConcurrency()
+    concurrency.enable(maximum=8)
+    limiter = concurrency.limiter("example.com")
+    limiter.limit = 4.0
+
+    with pytest.raises(type(error)), concurrency.slot("example.com"):
+        raise error
+
+    assert limiter.limit == 2
+    assert limiter.baseline is None
+
+
+def test_client_errors_do_not_decrease_limit():
+    concurrency = AdaptiveConcurrency()
+    concurrency.enable(maximum=8)
+    limiter = concurrency.limiter("example.com")
+
+    with pytest.raises(HTTPError), concurrency.slot("example.com"):
+        raise HTTPError("https://example.com", 404, "Not Found", None, None)
+
+    assert limiter.limit == INITIAL_LIMIT
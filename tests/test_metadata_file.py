@@ -0,0 +1,96 @@
+import datetime
+import re
+
+import pytest
+
+from beetsplug.metadata_file import find_metadata_file, load_metadata_file, validate_metadata
+
+
+def make_metadata(**fields):
+    return {
+        "title": "Wizard's First Rule",
+        "authors": ["Terry Goodkind"],
+        "narrators": ["Sam Tsoutsouvas"],
+        "description": "A book",
+        "genres": ["Fantasy"],
+        "releaseDate": datetime.date(2003, 9, 1),
+        "publisher": "Brilliance Audio",
+        **fields,
+    }
+
+
+def test_valid_metadata_is_unchanged():
+    data = make_metadata(series="Sword of Truth", seriesPosition=1, language="English")
+
+    assert validate_metadata(data) == data
+
+
+def test_empty_optional_fields_are_accepted():
+    data = validate_metadata(make_metadata(description=None, subtitle=None, series=None, seriesPosition=None))
+
+    assert data["description"] is None
+
+
+def test_numbers_in_text_fields_are_converted():
+    data = validate_metadata(make_metadata(title=1984, publisher=42, authors=["George Orwell", 2], genres=[1]))
+
+    assert data["title"] == "1984"
+    assert data["publisher"] == "42"
+    assert data["authors"] == ["George Orwell", "2"]
+    assert data["genres"] == ["1"]
+
+
+def test_release_dates_are_parsed_from_strings():
+    data = validate_metadata(make_metadata(releaseDate="2003-09-01T00:00:00Z"))
+
+    assert data["releaseDate"] == datetime.date(2003, 9, 1)
+
+
+def test_input_is_not_modified():
+    data = make_metadata(title=1984, releaseDate="2003-09-01")
+
+    validate_metadata(data)
+
+    assert data["title"] == 1984
+    assert data["releaseDate"] == "2003-09-01"
+
+
+@pytest.mark.parametrize(
+    ("data", "error"),
+    [
+        (["not", "a", "mapping"], "must be a mapping"),
+        ({k: v for k, v in make_metadata().items() if k != "authors"}, "missing required field 'authors'"),
+        (make_metadata(title=None), "'title' must have a value"),
+        (make_metadata(releaseDate="September 2003"), "is not a yyyy-mm-dd date"),
+        (make_metadata(releaseDate=2003), "'releaseDate' has an invalid value"),
+        (make_metadata(authors="Terry Goodkind"), "'authors' must be a list of strings"),
+        (make_metadata(narrators=[["Sam Tsoutsouvas"]]), "'narrators' must be a list of strings"),
+        (make_metadata(publisher=["Brilliance Audio"]), "'publisher' has an invalid value"),
+        (make_metadata(seriesPosition=[1]), "'seriesPosition' has an invalid value"),
+    ],
+)
+def test_invalid_metadata_is_rejected(data, error):
+    with pytest.raises(ValueError, match=re.escape(error)):
+        validate_metadata(data)
+
+
+def test_yml_is_preferred_to_json(tmp_path):
+    assert find_metadata_file(str(tmp_path)) is None
+    (tmp_path / "metadata.json").write_text("{}")
+    assert find_metadata_file(str(tmp_path)) == str(tmp_path / "metadata.json")
+    (tmp_path / "metadata.yml").write_text("")
+    assert find_metadata_file(str(tmp_path)) == str(tmp_path / "metadata.yml")
+
+
+def test_loaded_metadata_is_a_copy(tmp_path):
+    path = tmp_path / "metadata.yml"
+    path.write_text(
+        "title: 1984\nauthors: [George Orwell]\nnarrators: [Simon Prebble]\ndescription:\n"
+        "genres: [Fiction]\nreleaseDate: 2007-01-01\npublisher: Blackstone\n"
+    )
+
+    data = load_metadata_file(str(path))
+    data["genres"].append("Classics")
+
+    assert data["title"] == "1984"
+    assert load_metadata_file(str(path))["genres"] == ["Fiction"]
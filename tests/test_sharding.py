@@ -0,0 +1,117 @@
+import yaml
+
+from beetsplug.sharding import (
+    find_shard_entries,
+    get_worker_command,
+    split_into_shards,
+    write_loose_files_config,
+    write_shard_file,
+)
+
+
+def make_tree(root, paths):
+    for path in paths:
+        full_path = root / path
+        if path.endswith("/"):
+            full_path.mkdir(parents=True, exist_ok=True)
+        else:
+            full_path.parent.mkdir(parents=True, exist_ok=True)
+            full_path.touch()
+
+
+def test_subfolders_are_entries(tmp_path):
+    make_tree(tmp_path, ["Book B/01.mp3", "Book A/01.mp3", ".hidden/01.mp3", ".DS_Store"])
+
+    assert find_shard_entries([str(tmp_path)]) == ([str(tmp_path / "Book A"), str(tmp_path / "Book B")], [])
+
+
+def test_loose_files_are_imported_together(tmp_path):
+    make_tree(tmp_path, ["Book A/01.mp3", "Single 1.m4b", "Single 2.m4b"])
+
+    assert find_shard_entries([str(tmp_path)]) == ([str(tmp_path / "Book A")], [str(tmp_path)])
+
+
+def test_loose_files_can_be_split(tmp_path):
+    make_tree(tmp_path, ["Book A/01.mp3", "Single 2.m4b", "Single 1.m4b"])
+
+    assert find_shard_entries([str(tmp_path)], split_files=True) == (
+        [str(tmp_path / "Book A"), str(tmp_path / "Single 1.m4b"), str(tmp_path / "Single 2.m4b")],
+        [],
+    )
+
+
+def test_loose_files_config_ignores_subfolders(tmp_path):
+    make_tree(tmp_path, ["Book [1]/01.mp3", "Book 2/01.mp3", "Single.m4b"])
+    config_path = tmp_path / "config.yaml"
+
+    write_loose_files_config(str(config_path), str(tmp_path))
+
+    ignore = yaml.safe_load(config_path.read_text())["ignore"]
+    assert ignore[-2:] == ["Book 2", "Book [[]1]"]
+    assert ".*" in ignore
+
+
+def test_folder_without_subfolders_is_an_entry(tmp_path):
+    make_tree(tmp_path, ["Book/01.mp3", "Book/02.mp3"])
+
+    assert find_shard_entries([str(tmp_path / "Book")]) == ([str(tmp_path / "Book")], [])
+
+
+def test_disc_folders_are_kept_together(tmp_path):
+    make_tree(tmp_path, ["Book/Disc 1/01.mp3", "Book/Disc 2/01.mp3", "Other/CD1/01.mp3", "Other/CD2/01.mp3"])
+
+    assert find_shard_entries([str(tmp_path / "Book"), str(tmp_path / "Other")]) == (
+        [str(tmp_path / "Book"), str(tmp_path / "Other")],
+        [],
+    )
+
+
+def test_folders_that_are_not_all_discs_are_split(tmp_path):
+    make_tree(tmp_path, ["Series/Disc 1/01.mp3", "Series/Book 2/01.mp3"])
+
+    assert find_shard_entries([str(tmp_path / "Series")]) == (
+        [str(tmp_path / "Series" / "Book 2"), str(tmp_path / "Series" / "Disc 1")],
+        [],
+    )
+
+
+def test_file_paths_are_entries(tmp_path):
+    make_tree(tmp_path, ["Book.m4b"])
+
+    assert find_shard_entries([str(tmp_path / "Book.m4b")]) == ([str(tmp_path / "Book.m4b")], [])
+
+
+def test_entries_are_dealt_out_in_turn():
+    entries = [f"book{i}" for i in range(7)]
+
+    shards = split_into_shards(entries, 3)
+
+    assert shards == [["book0", "book3", "book6"], ["book1", "book4"], ["book2", "book5"]]
+
+
+def test_empty_shards_are_dropped():
+    assert split_into_shards(["book0", "book1"], 4) == [["book0"], ["book1"]]
+
+
+def test_shard_file_is_an_import_log(tmp_path):
+    path = tmp_path / "shard.log"
+
+    paths = write_shard_file(str(path), ["/audiobooks/Book A", "/audiobooks/Book; A Novel", "/audiobooks/Book B"])
+
+    assert path.read_text() == "skip /audiobooks/Book A\nskip /audiobooks/Book B\n"
+    # beets would read this line as two paths, so it's passed as an argument instead
+    assert paths == ["/audiobooks/Book; A Novel"]
+
+
+def test_paths_are_passed_after_import_options(tmp_path):
+    command = get_worker_command(str(tmp_path / "shard.log"), ["--move"], ["/audiobooks/Book; A Novel"])
+
+    assert command[command.index("import") :] == [
+        "import",
+        "--quiet",
+        "--from-logfile",
+        str(tmp_path / "shard.log"),
+        "--move",
+        "--",
+        "/audiobooks/Book; A Novel",
+    ]